@@ -1,35 +1,565 @@
-from flask import Flask, render_template, jsonify, request, Response, send_file
-import sqlite3
+from flask import Flask, render_template, jsonify, request, Response, g, make_response
+import functools
 import json
-from datetime import datetime
-from collections import defaultdict
+import os
+import sys
+import base64
+import html
+import concurrent.futures
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_CEILING, ROUND_FLOOR
+from collections import defaultdict, OrderedDict, deque
 import io
 import csv
+import queue
+import threading
+import time
+import zlib
+
+# Schema e acesso a dados são compartilhados com o app desktop (src/services/repository.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from services import repository
+from services.repository import TransactionFilter
 
 app = Flask(__name__)
 
-# Configuração do banco
-DATABASE = 'database.db'
+# Configuração do banco (pode ser sobrescrita por variáveis FLASK_*, ex.: FLASK_SQLITE_POOL_SIZE=16)
+app.config.update(
+    DATABASE='database.db',
+    SQLITE_POOL_SIZE=8,                  # conexões ociosas mantidas abertas (0 desliga o pool)
+    SQLITE_JOURNAL_MODE='wal',
+    SQLITE_SYNCHRONOUS='normal',
+    SQLITE_BUSY_TIMEOUT=5000,            # ms
+    SQLITE_CACHE_SIZE=-16000,            # negativo = KiB por conexão
+    SQLITE_MMAP_SIZE=256 * 1024 * 1024,  # bytes
+    BATCH_MAX_ROWS=10000,                # limite de linhas por POST /api/transacoes/batch
+    RESPONSE_CACHE_MAX_ENTRIES=256,
+    RESPONSE_CACHE_MAX_BYTES=8 * 1024 * 1024,
+    RESPONSE_CACHE_RELATIVE_TTL=60,      # s; period=30days/this_month depende do relógio
+    SSE_HEARTBEAT=15,                    # s entre comentários de keep-alive no /api/events
+    SSE_HISTORY=1000,                    # eventos guardados para reconexão via Last-Event-ID
+    SSE_QUEUE_SIZE=256,                  # eventos pendentes por assinante antes de desconectá-lo
+    CHANGES_MAX_LIMIT=5000,              # alterações por página do /api/changes
+    CHANGES_CONSUMER_TTL_DAYS=30,        # consumidores inativos deixam de segurar a compactação
+    WRITE_QUEUE_ENABLED=True,            # escritas passam pela thread única com group commit
+    WRITE_QUEUE_WINDOW_MS=0.5,             # espera por mais escritas antes do commit (só sob concorrência)
+    WRITE_QUEUE_MAX_BATCH=256,           # escritas por commit
+)
+app.config.from_prefixed_env()
+
+
+def get_pool():
+    pool = app.extensions.get('sqlite_pool')
+    if pool is None:
+        pool = app.extensions['sqlite_pool'] = repository.ConnectionPool(
+            app.config['DATABASE'],
+            app.config['SQLITE_POOL_SIZE'],
+            journal_mode=app.config['SQLITE_JOURNAL_MODE'],
+            synchronous=app.config['SQLITE_SYNCHRONOUS'],
+            busy_timeout=app.config['SQLITE_BUSY_TIMEOUT'],
+            cache_size=app.config['SQLITE_CACHE_SIZE'],
+            mmap_size=app.config['SQLITE_MMAP_SIZE']
+        )
+    return pool
+
 
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Conexão do contexto atual; devolvida ao pool no teardown"""
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db_connection(exc):
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+class WriteQueue:
+    """Thread única de escrita com group commit.
+
+    As requisições enfileiram funções fn(conn); a thread junta o que chegar
+    dentro da janela (ou até max_batch itens) e executa tudo em uma única
+    transação, com um SAVEPOINT por item para que a falha de um não desfaça os
+    outros. Cada requisição recebe seu resultado por um Future, resolvido só
+    depois do COMMIT.
+    """
+
+    def __init__(self, pool, window, max_batch):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = self.writes = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn):
+        future = concurrent.futures.Future()
+        self._queue.put((fn, future))
+        with self._lock:
+            if self._thread is None:
+                self._start()
+        return future
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        conn = None
+        concorrente = False
+        try:
+            while True:
+                batch = [self._queue.get()]
+                # Sem concorrência a janela só somaria latência: commita o que já está na fila
+                deadline = time.monotonic() + (self.window if concorrente else 0)
+                while len(batch) < self.max_batch:
+                    restante = deadline - time.monotonic()
+                    try:
+                        batch.append(self._queue.get(timeout=restante) if restante > 0 else self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                concorrente = len(batch) > 1
+                try:
+                    if conn is None:
+                        conn = self.pool.connect()
+                        conn.isolation_level = None  # BEGIN/COMMIT explícitos
+                    self._commit(conn, batch)
+                except Exception as e:
+                    # Conexão que não abre ou que falhou no ROLLBACK: o lote
+                    # falha, a conexão é descartada e a próxima escrita abre outra
+                    self._fail(batch, e)
+                    if conn is not None:
+                        try:
+                            conn.close()
+                        except Exception:
+                            pass
+                        conn = None
+        finally:
+            # Se mesmo assim a thread morrer, o próximo submit (ou o que já
+            # estiver na fila) inicia outra
+            with self._lock:
+                self._thread = None
+                if not self._queue.empty():
+                    self._start()
+
+    @staticmethod
+    def _fail(batch, erro):
+        for _, future in batch:
+            if not future.done() and (future.running() or future.set_running_or_notify_cancel()):
+                future.set_exception(erro)
+
+    def _commit(self, conn, batch):
+        resultados = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute('SAVEPOINT escrita')
+                try:
+                    resultados.append((future, fn(conn), None))
+                    conn.execute('RELEASE escrita')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO escrita')
+                    conn.execute('RELEASE escrita')
+                    resultados.append((future, None, e))
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            self._fail(batch, e)
+            return
+
+        self.batches += 1
+        self.writes += len(resultados)
+        for future, resultado, erro in resultados:
+            if erro is None:
+                future.set_result(resultado)
+            else:
+                future.set_exception(erro)
+
+
+def get_write_queue():
+    write_queue = app.extensions.get('write_queue')
+    if write_queue is None:
+        write_queue = app.extensions['write_queue'] = WriteQueue(
+            get_pool(),
+            app.config['WRITE_QUEUE_WINDOW_MS'] / 1000,
+            app.config['WRITE_QUEUE_MAX_BATCH']
+        )
+    return write_queue
+
+
+def executar_escrita(fn):
+    """Executa fn(conn) em uma transação de escrita e devolve o resultado após o commit.
+
+    Espera sem timeout: desistir antes deixaria a escrita ser confirmada
+    depois sem que cache e assinantes fossem avisados.
+    """
+    if app.config['WRITE_QUEUE_ENABLED']:
+        return get_write_queue().submit(fn).result()
 
-def init_db():
     conn = get_db_connection()
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tipo TEXT NOT NULL,
-            categoria TEXT NOT NULL,
-            valor REAL NOT NULL,
-            descricao TEXT,
-            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    try:
+        resultado = fn(conn)
+        conn.commit()
+        return resultado
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def executar_escrita_versionada(fn):
+    """Como executar_escrita, mas devolve (resultado, (versão antes, versão depois)).
+
+    As duas versões são lidas dentro da transação da escrita e vão para
+    notificar_alteracao, que as usa para manter no cache o que a escrita
+    não afetou.
+    """
+    def escrita(conn):
+        antes = repository.get_data_version(conn)
+        resultado = fn(conn)
+        return resultado, (antes, repository.get_data_version(conn))
+    return executar_escrita(escrita)
+
+
+def init_db():
+    """Aplica as migrações pendentes do schema compartilhado (nenhuma num banco em dia)"""
+    conn = get_pool().connect()
+    try:
+        repository.migrate(conn)
+    finally:
+        conn.close()
+
+
+@app.cli.command('rebuild-rollup')
+def rebuild_rollup_command():
+    """Reconstrói a tabela transactions_monthly (flask --app app rebuild-rollup)"""
+    init_db()
+    repository.rebuild_rollup(get_db_connection())
+    print('✅ Agregado mensal reconstruído')
+
+
+# =================== VERSÃO DOS DADOS / ETAG ===================
+
+def get_data_version():
+    return repository.get_data_version(get_db_connection())
+
+
+def conditional_get(view):
+    """Envia a versão dos dados como ETag e responde 304 sem executar a view.
+
+    A versão é lida antes da consulta: se uma escrita acontecer no meio, o
+    ETag fica "atrasado" e a próxima requisição apenas baixa os dados de novo.
+    Períodos relativos (30days, this_month) andam com o relógio sem que a
+    versão mude, então o início resolvido do intervalo também entra no ETag.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = f'v{get_data_version()}'
+        if request.args.get('period', 'all') != 'all':
+            try:
+                inicio, _ = limites_de_data(request.args)
+            except ValueError:
+                return view(*args, **kwargs)  # a view responde o 400
+            if inicio:
+                etag += f'-{para_epoch(inicio)}'
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
+
+
+# =================== CACHE DE RESPOSTAS ===================
+
+class ResponseCache:
+    """Cache LRU em memória dos payloads JSON já serializados.
+
+    Cada entrada guarda o intervalo de datas [inicio, fim) que ela cobre; as
+    escritas invalidam apenas as entradas cujo intervalo contém a data da linha
+    alterada. O limite é por número de entradas e por bytes. Cada entrada
+    também guarda a versão dos dados em que foi montada e só é servida
+    enquanto ela não mudar: as entradas que sobrevivem a uma invalidação
+    passam para a versão produzida pela escrita, então só escritas de fora
+    deste processo (app desktop, scripts) esvaziam o cache inteiro.
+    """
+
+    def __init__(self, max_entries, max_bytes, relative_ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.relative_ttl = relative_ttl
+        self._entries = OrderedDict()  # chave -> (body, inicio, fim, expira_em, versão)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        # Incrementada a cada invalidação: evita gravar um payload calculado
+        # antes de uma escrita que terminou enquanto ele era montado
+        self.generation = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None and entry[4] == version
+                    and (entry[3] is None or entry[3] > time.monotonic())):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, body, inicio, fim, generation, version, relative=False):
+        if len(body) > self.max_bytes:
+            return
+        expira_em = time.monotonic() + self.relative_ttl if relative else None
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, inicio, fim, expira_em, version)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, datas, versoes=None):
+        """Remove as entradas afetadas por escritas em linhas com essas datas.
+
+        versoes=(antes, depois) é a versão dos dados antes e depois da
+        escrita; as entradas não afetadas que estavam em antes passam para
+        depois. Entradas em outra versão ficam como estão (e expiram no get):
+        pode haver escritas de outros processos no meio.
+        """
+        datas = list(datas)
+        conhecidas = [d for d in datas if d]
+        menor = min(conhecidas) if conhecidas else None
+        maior = max(conhecidas) if conhecidas else None
+        sem_data = len(conhecidas) < len(datas)
+
+        with self._lock:
+            self.generation += 1
+            for key, entry in list(self._entries.items()):
+                body, inicio, fim, expira_em, version = entry
+                # Linhas sem data só aparecem em consultas sem filtro de data
+                afetada = sem_data and inicio is None and fim is None
+                if menor is not None:
+                    afetada = afetada or ((inicio is None or maior >= inicio) and (fim is None or menor < fim))
+                if afetada:
+                    self._remove(key)
+                    self.invalidations += 1
+                elif versoes is not None and version == versoes[0]:
+                    self._entries[key] = (body, inicio, fim, expira_em, versoes[1])
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+
+    def _remove(self, key):
+        body = self._entries.pop(key)[0]
+        self._bytes -= len(body)
+
+
+def get_response_cache():
+    cache = app.extensions.get('response_cache')
+    if cache is None:
+        cache = app.extensions['response_cache'] = ResponseCache(
+            app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+            app.config['RESPONSE_CACHE_MAX_BYTES'],
+            app.config['RESPONSE_CACHE_RELATIVE_TTL']
+        )
+    return cache
+
+
+def cached_json(view):
+    """Serve o payload do cache, chaveado pelo endpoint e pelos parâmetros normalizados"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_response_cache()
+        key = (request.endpoint, tuple(sorted(kwargs.items())),
+               tuple(sorted((k, v.strip()) for k, v in request.args.items(multi=True) if v.strip())))
+
+        # Escritas de outros processos (app desktop, scripts) não passam por
+        # notificar_alteracao: a versão dos dados descarta o que ficou velho
+        version = get_data_version()
+        body = cache.get(key, version)
+        if body is not None:
+            return Response(body, mimetype='application/json')
+
+        generation = cache.generation
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            inicio, fim = limites_de_data(request.args)
+            relative = request.args.get('period', 'all') != 'all'
+            cache.set(key, response.get_data(), inicio, fim, generation, version, relative)
+        return response
+    return wrapper
+
+
+@app.get('/api/cache/stats')
+def get_cache_stats():
+    return jsonify(get_response_cache().stats())
+
+
+# =================== EVENTOS (SSE) ===================
+
+class EventBroker:
+    """Distribui os eventos de alteração para os assinantes do /api/events.
+
+    Cada assinante tem uma fila limitada; quem não consome a tempo é
+    desconectado e, ao reconectar com Last-Event-ID, recebe o que perdeu a
+    partir do histórico em memória (ou um evento 'reset' se já saiu dele).
+
+    Os ids são "<boot>-<n>": a contagem recomeça quando o processo reinicia,
+    e o token de boot evita que um id antigo seja confundido com um novo.
+    """
+
+    def __init__(self, history, queue_size):
+        self.queue_size = queue_size
+        self.boot = os.urandom(4).hex()
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._last_id = 0
+
+    def publish(self, event, data):
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._last_id += 1
+            message = f'id: {self.boot}-{self._last_id}\nevent: {event}\ndata: {payload}\n\n'
+            self._history.append((self._last_id, message))
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    self._subscribers.discard(subscriber)
+                    subscriber.overflowed = True
+
+    def subscribe(self, last_event_id=None):
+        """Registra um assinante e devolve (fila, mensagens a reenviar).
+
+        last_event_id é o Last-Event-ID enviado pelo cliente, como recebido.
+        """
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        subscriber.overflowed = False
+        boot, _, numero = (last_event_id or '').rpartition('-')
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if not last_event_id:
+                return subscriber, []
+            ultimo = int(numero) if boot == self.boot and numero.isdigit() else None
+            if ultimo == self._last_id:
+                return subscriber, []
+            primeiro = self._history[0][0] if self._history else self._last_id + 1
+            if ultimo is None or ultimo > self._last_id or ultimo < primeiro - 1:
+                # O servidor reiniciou ou o histórico não cobre mais: o cliente recarrega tudo
+                return subscriber, [f'id: {self.boot}-{self._last_id}\nevent: reset\ndata: {{}}\n\n']
+            return subscriber, [message for event_id, message in self._history if event_id > ultimo]
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def get_event_broker():
+    broker = app.extensions.get('event_broker')
+    if broker is None:
+        broker = app.extensions['event_broker'] = EventBroker(
+            app.config['SSE_HISTORY'], app.config['SSE_QUEUE_SIZE']
         )
-    ''')
-    conn.commit()
-    conn.close()
+    return broker
+
+
+# Lotes maiores que isso publicam só ids e deltas; as páginas recarregam a lista
+EVENTO_MAX_LINHAS = 100
+
+
+def transacao_inserida(new_id, valores):
+    tipo, categoria, centavos, descricao, date = valores
+    return {'id': new_id, 'tipo': tipo, 'categoria': categoria, 'valor': para_reais(centavos),
+            'valor_centavos': centavos, 'descricao': descricao, 'data': date}
+
+
+def com_data(valores, agora):
+    """Preenche a data ausente com agora, para gravar e devolver o mesmo instante"""
+    return valores if valores[4] else valores[:4] + (agora,)
+
+
+def notificar_alteracao(op, transacoes, versoes=None):
+    """Avisa cache e assinantes depois que uma escrita foi confirmada.
+
+    O evento leva as linhas afetadas e os deltas por (mês, tipo, categoria),
+    que é o que as páginas precisam para atualizar totais e gráficos no lugar.
+    versoes vem de executar_escrita_versionada.
+    """
+    get_response_cache().invalidate((t['data'] for t in transacoes), versoes)
+
+    sinal = -1 if op == 'delete' else 1
+    deltas = defaultdict(lambda: [0, 0])
+    for t in transacoes:
+        delta = deltas[((t['data'] or '')[:7], t['tipo'], t['categoria'])]
+        delta[0] += sinal * t['valor_centavos']
+        delta[1] += sinal
+
+    get_event_broker().publish('change', {
+        'op': op,
+        'ids': [t['id'] for t in transacoes],
+        'transacoes': transacoes if op != 'delete' and len(transacoes) <= EVENTO_MAX_LINHAS else [],
+        'deltas': [{'mes': mes, 'tipo': tipo, 'categoria': categoria,
+                    'valor': para_reais(centavos), 'valor_centavos': centavos, 'quantidade': quantidade}
+                   for (mes, tipo, categoria), (centavos, quantidade) in deltas.items()]
+    })
+
+
+@app.get('/api/events')
+def stream_events():
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    broker = get_event_broker()
+    heartbeat = app.config['SSE_HEARTBEAT']
+    subscriber, pendentes = broker.subscribe(last_event_id)
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            yield from pendentes
+            while not subscriber.overflowed:
+                try:
+                    yield subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': ping\n\n'
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 # =================== ROTAS DE PÁGINA ===================
@@ -47,150 +577,627 @@ def charts_page():
     return render_template('charts.html')
 
 
+# =================== FILTROS E PAGINAÇÃO ===================
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+def para_reais(centavos):
+    """Centavos -> número decimal para o JSON (o float mais próximo, ex.: 1234 -> 12.34)"""
+    return centavos / 100
+
+
+def formatar_centavos(centavos):
+    """Centavos -> texto com duas casas exatas, sem passar por float (ex.: -5 -> '-0.05')"""
+    sinal = '-' if centavos < 0 else ''
+    inteiro, resto = divmod(abs(centavos), 100)
+    return f'{sinal}{inteiro}.{resto:02d}'
+
+
+def serializar_transacao(record):
+    """TransactionRecord do repositório -> JSON da API (campos em português)"""
+    return {
+        'id': record.id,
+        'tipo': record.type,
+        'categoria': record.category,
+        'valor': para_reais(record.value_cents),
+        'valor_centavos': record.value_cents,
+        'descricao': record.description,
+        'data': record.date
+    }
+
+
+def encode_cursor(epoch, row_id):
+    """Gera o token opaco do cursor a partir da chave (date_epoch, id) da última linha"""
+    raw = json.dumps([epoch, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, tipo_chave=int, aceita_nulo=True):
+    """Recupera a chave (date_epoch, id) de um token gerado por encode_cursor.
+
+    A busca textual usa o mesmo formato com a relevância (float) no lugar de
+    date_epoch; tipo_chave diz o que aceitar no primeiro elemento. Com
+    aceita_nulo, a chave pode ser null (linha sem data).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        chave, row_id = json.loads(raw)
+        if chave is None and aceita_nulo and isinstance(row_id, int) and not isinstance(row_id, bool):
+            return chave, row_id
+        if isinstance(chave, bool) or not isinstance(chave, tipo_chave) or not isinstance(row_id, int):
+            raise ValueError()
+        return chave, row_id
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def parse_data(valor, fim=False):
+    """Converte aaaa-mm-dd[ hh:mm:ss] para o formato do banco.
+
+    Quando só a data é informada e fim=True, devolve o início do dia seguinte,
+    para que o limite superior inclua o dia inteiro.
+    """
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            dt = datetime.strptime(valor, fmt)
+        except ValueError:
+            continue
+        if fim and fmt == '%Y-%m-%d':
+            dt += timedelta(days=1)
+        return dt.strftime('%Y-%m-%d %H:%M:%S')
+    raise ValueError(f'Data inválida: {valor}')
+
+
+def para_epoch(data):
+    """Converte uma data no formato do banco (UTC) em segundos, como o date_epoch"""
+    return int(datetime.strptime(data, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp())
+
+
+def agora_utc():
+    """Instante atual no mesmo formato do CURRENT_TIMESTAMP do SQLite"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def limites_de_data(args):
+    """Intervalo [inicio, fim) pedido via period e from/to; None quando aberto"""
+    inicio = fim = None
+
+    # O banco grava CURRENT_TIMESTAMP, que está em UTC
+    period = args.get('period', 'all')
+    now = datetime.now(timezone.utc)
+    if period == '30days':
+        # Alinhado ao início do dia: o filtro (e o ETag) só mudam uma vez por dia
+        inicio = (now - timedelta(days=30)).strftime('%Y-%m-%d 00:00:00')
+    elif period == 'this_month':
+        inicio = now.strftime('%Y-%m-01 00:00:00')
+    elif period != 'all':
+        raise ValueError(f'Período inválido: {period}')
+
+    if args.get('from'):
+        inicio = max(filter(None, (inicio, parse_data(args['from']))))
+    if args.get('to'):
+        fim = parse_data(args['to'], fim=True)
+
+    return inicio, fim
+
+
+def build_filters(args):
+    """Monta o TransactionFilter a partir dos filtros da query string.
+
+    Filtros aceitos: tipo, categoria, period (all, 30days, this_month),
+    from/to (aaaa-mm-dd) e valor_min/valor_max. Levanta ValueError para
+    parâmetros inválidos.
+    """
+    filtros = TransactionFilter(
+        type=args.get('tipo', '').strip() or None,
+        category=args.get('categoria', '').strip() or None
+    )
+
+    # Intervalos viram faixas de inteiros em date_epoch, resolvidas pelos índices
+    inicio, fim = limites_de_data(args)
+    if inicio:
+        filtros.start_epoch = para_epoch(inicio)
+    if fim:
+        filtros.end_epoch = para_epoch(fim)
+
+    # Arredonda para dentro da faixa: valor_min=10.005 equivale a >= 10.01
+    for campo, atributo, arredondamento in (('valor_min', 'min_cents', ROUND_CEILING),
+                                            ('valor_max', 'max_cents', ROUND_FLOOR)):
+        if args.get(campo):
+            try:
+                setattr(filtros, atributo, repository.to_cents(args[campo], arredondamento))
+            except ValueError:
+                raise ValueError(f'{campo} inválido')
+
+    return filtros
+
+
 # =================== API DE TRANSACOES ===================
 
 @app.get('/api/transacoes')
+@conditional_get
 def get_transacoes():
-    conn = get_db_connection()
-    rows = conn.execute('SELECT * FROM transactions ORDER BY date DESC').fetchall()
-    conn.close()
+    try:
+        filtros = build_filters(request.args)
+        limite = int(request.args.get('limit', LIMITE_PADRAO))
+        if not 1 <= limite <= LIMITE_MAXIMO:
+            raise ValueError(f'limit deve estar entre 1 e {LIMITE_MAXIMO}')
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Busca uma linha a mais só para saber se existe próxima página
+    rows = repository.list_transactions(get_db_connection(), filtros, limite + 1, after)
+
+    next_cursor = None
+    if len(rows) > limite:
+        rows = rows[:limite]
+        next_cursor = encode_cursor(rows[-1].date_epoch, rows[-1].id)
+
+    return jsonify({
+        'transacoes': [serializar_transacao(row) for row in rows],
+        'next_cursor': next_cursor
+    }), 200
+
+
+CAMPOS_OBRIGATORIOS = ['tipo', 'categoria', 'descricao']
 
-    data = [{
-        'id': row['id'],
-        'tipo': row['tipo'],
-        'categoria': row['categoria'],
-        'valor': row['valor'],
-        'descricao': row['descricao'],
-        'data': row['date']
-    } for row in rows]
 
-    return jsonify(data), 200
+def validar_transacao(data):
+    """Valida o payload de uma transação e devolve os argumentos de repository.insert_transaction.
+
+    O valor vem em reais ('valor', arredondado para o centavo) ou já em
+    centavos ('valor_centavos', inteiro). O campo 'data' (aaaa-mm-dd[ hh:mm:ss])
+    é opcional; sem ele vale o CURRENT_TIMESTAMP do banco. Levanta ValueError
+    com a mensagem de erro.
+    """
+    if (not isinstance(data, dict)
+            or not all(c in data and str(data[c]).strip() for c in CAMPOS_OBRIGATORIOS)
+            or all(data.get(c) in (None, '') for c in ('valor', 'valor_centavos'))):
+        raise ValueError('Campos obrigatórios: tipo, categoria, valor, descricao')
+
+    try:
+        if data.get('valor_centavos') not in (None, ''):
+            centavos = repository.check_value_cents(data['valor_centavos'])
+        else:
+            centavos = repository.check_value_cents(repository.to_cents(data['valor']))
+    except ValueError:
+        raise ValueError('Valor inválido')
+
+    date = parse_data(str(data['data'])) if data.get('data') else None
+    return (str(data['tipo']).strip(), str(data['categoria']).strip(), centavos, str(data['descricao']).strip(), date)
 
 
 @app.post('/api/transacoes')
 def add_transacao():
     data = request.get_json(silent=True) or {}
 
-    campos = ['tipo', 'categoria', 'valor', 'descricao']
-    if not all(c in data and str(data[c]).strip() for c in campos):
-        return jsonify({'error': 'Campos obrigatórios: tipo, categoria, valor, descricao'}), 400
+    try:
+        valores = com_data(validar_transacao(data), agora_utc())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    new_id, versoes = executar_escrita_versionada(lambda conn: repository.insert_transaction(conn, *valores))
+
+    # A mesma linha (e a mesma data, em UTC) vai para o banco, o evento e a resposta
+    transacao = transacao_inserida(new_id, valores)
+    notificar_alteracao('insert', [transacao], versoes)
+    return jsonify(transacao), 201
+
+
+@app.post('/api/transacoes/batch')
+def add_transacoes_batch():
+    """Insere várias transações em uma única transação do banco.
+
+    Aceita um array JSON, {"transacoes": [...]} ou NDJSON
+    (Content-Type: application/x-ndjson). Com ?modo=atomico (padrão) nada é
+    gravado se alguma linha for inválida; com ?modo=parcial as linhas
+    inválidas são ignoradas e as demais gravadas.
+    """
+    modo = request.args.get('modo', 'atomico')
+    if modo not in ('atomico', 'parcial'):
+        return jsonify({'error': f'modo inválido: {modo}'}), 400
+
+    if request.mimetype == 'application/x-ndjson':
+        linhas = []
+        for linha in request.get_data(as_text=True).splitlines():
+            if not linha.strip():
+                continue
+            try:
+                linhas.append(json.loads(linha))
+            except ValueError:
+                linhas.append(None)  # vira erro de validação da linha
+    else:
+        linhas = request.get_json(silent=True)
+        if isinstance(linhas, dict):
+            linhas = linhas.get('transacoes')
+        if not isinstance(linhas, list):
+            return jsonify({'error': 'Envie um array de transações, {"transacoes": [...]} ou NDJSON'}), 400
+
+    limite = app.config['BATCH_MAX_ROWS']
+    if not linhas or len(linhas) > limite:
+        return jsonify({'error': f'O lote deve ter entre 1 e {limite} transações'}), 400
+
+    resultados, validas = [], []
+    agora = agora_utc()
+    for indice, data in enumerate(linhas):
+        try:
+            validas.append((indice, com_data(validar_transacao(data), agora)))
+            resultados.append({'indice': indice, 'ok': True})
+        except ValueError as e:
+            resultados.append({'indice': indice, 'ok': False, 'error': str(e)})
+
+    if (modo == 'atomico' and len(validas) < len(linhas)) or not validas:
+        return jsonify({'inseridos': 0, 'resultados': resultados}), 400
 
+    ultimo_id, versoes = executar_escrita_versionada(
+        lambda conn: repository.insert_transactions(conn, [valores for _, valores in validas])
+    )
+
+    primeiro_id = ultimo_id - len(validas) + 1
+    for offset, (indice, _) in enumerate(validas):
+        resultados[indice]['id'] = primeiro_id + offset
+
+    notificar_alteracao('insert', [transacao_inserida(primeiro_id + offset, valores)
+                                   for offset, (_, valores) in enumerate(validas)], versoes)
+
+    return jsonify({'inseridos': len(validas), 'resultados': resultados}), 201
+
+
+@app.delete('/api/transacoes/<int:transacao_id>')
+def delete_transacao(transacao_id):
+    record, versoes = executar_escrita_versionada(lambda conn: repository.delete_transaction(conn, transacao_id))
+    if record is not None:
+        notificar_alteracao('delete', [serializar_transacao(record)], versoes)
+    return jsonify({'ok': True}), 200
+
+
+# =================== BUSCA TEXTUAL (FTS5) ===================
+
+# Marcadores do snippet: caracteres de controle que não aparecem no texto,
+# trocados por <mark> depois de escapar o HTML da descrição
+MARCA_INICIO, MARCA_FIM = '\x02', '\x03'
+
+
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Reconstrói o índice de busca textual (flask --app app rebuild-search)"""
+    init_db()
+    repository.rebuild_search(get_db_connection())
+    print('✅ Índice de busca reconstruído')
+
+
+def consulta_fts(texto):
+    """Consulta FTS5 do texto digitado (veja repository.fts_query); ValueError se vazia"""
+    consulta = repository.fts_query(texto)
+    if consulta is None:
+        raise ValueError('Informe o texto da busca em q')
+    return consulta
+
+
+def destacar(trecho):
+    return html.escape(trecho).replace(MARCA_INICIO, '<mark>').replace(MARCA_FIM, '</mark>')
+
+
+@app.get('/api/transacoes/search')
+@conditional_get
+def search_transacoes():
+    """Busca por descrição e categoria, ordenada por relevância (bm25).
+
+    Aceita os mesmos filtros e a mesma paginação por cursor de
+    /api/transacoes; com ?ordem=data os resultados vêm do mais recente para o
+    mais antigo, como na listagem.
+    """
+    ordem = request.args.get('ordem', 'relevancia')
     try:
-        valor = float(data['valor'])
-        if valor <= 0:
+        if ordem not in ('relevancia', 'data'):
+            raise ValueError(f'ordem inválida: {ordem}')
+        consulta = consulta_fts(request.args.get('q', ''))
+        filtros = build_filters(request.args)
+        limite = int(request.args.get('limit', LIMITE_PADRAO))
+        if not 1 <= limite <= LIMITE_MAXIMO:
+            raise ValueError(f'limit deve estar entre 1 e {LIMITE_MAXIMO}')
+        after = None
+        if request.args.get('cursor'):
+            after = decode_cursor(request.args['cursor'], (int, float) if ordem == 'relevancia' else int,
+                                  aceita_nulo=ordem != 'relevancia')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    rows = repository.search_transactions(conn, consulta, filtros, limite + 1, after,
+                                          'rank' if ordem == 'relevancia' else 'date')
+
+    next_cursor = None
+    if len(rows) > limite:
+        rows = rows[:limite]
+        ultima, relevancia = rows[-1]
+        next_cursor = encode_cursor(relevancia if ordem == 'relevancia' else ultima.date_epoch, ultima.id)
+
+    # Snippets só para as linhas da página
+    trechos = repository.search_snippets(conn, consulta, [record.id for record, _ in rows],
+                                         MARCA_INICIO, MARCA_FIM)
+
+    return jsonify({
+        'transacoes': [dict(serializar_transacao(record), trecho=destacar(trechos.get(record.id) or ''))
+                       for record, _ in rows],
+        'next_cursor': next_cursor
+    }), 200
+
+
+# =================== LOG DE ALTERAÇÕES (CDC) ===================
+
+def compactar_changes(conn):
+    """Compacta o log até onde todos os consumidores ativos já leram; devolve o watermark"""
+    return repository.compact_changes(conn, app.config['CHANGES_CONSUMER_TTL_DAYS'])
+
+
+@app.cli.command('compact-changes')
+def compact_changes_command():
+    """Compacta o log de alterações (flask --app app compact-changes)"""
+    init_db()
+    print(f'✅ Log compactado até seq {executar_escrita(compactar_changes)}')
+
+
+@app.get('/api/changes')
+def get_changes():
+    """Alterações com seq > since, em ordem.
+
+    Com ?consumer=<nome>, o pedido também confirma que esse consumidor já
+    processou tudo até since, o que permite compactar o log. Quando since é
+    anterior ao trecho já compactado a resposta é 410: o cliente precisa
+    refazer a sincronização completa.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limite = int(request.args.get('limit', 500))
+        if since < 0 or not 1 <= limite <= app.config['CHANGES_MAX_LIMIT']:
             raise ValueError()
-    except Exception:
-        return jsonify({'error': 'Valor inválido'}), 400
+    except ValueError:
+        return jsonify({'error': f"since deve ser >= 0 e limit entre 1 e {app.config['CHANGES_MAX_LIMIT']}"}), 400
 
     conn = get_db_connection()
-    cursor = conn.execute(
-        'INSERT INTO transactions (tipo, categoria, valor, descricao) VALUES (?, ?, ?, ?)',
-        (data['tipo'].strip(), data['categoria'].strip(), valor, data['descricao'].strip())
-    )
-    conn.commit()
-    new_id = cursor.lastrowid
-    conn.close()
+    consumer = request.args.get('consumer', '').strip()
+    if consumer:
+        def confirmar(conn):
+            repository.register_consumer(conn, consumer, since)
+            return compactar_changes(conn)
+        watermark = executar_escrita(confirmar)
+    else:
+        watermark = repository.get_change_watermark(conn)
+
+    if since < watermark:
+        return jsonify({'error': 'Alterações já compactadas; refaça a sincronização completa',
+                        'watermark': watermark}), 410
 
+    rows = repository.list_changes(conn, since, limite + 1)
+
+    has_more = len(rows) > limite
+    rows = rows[:limite]
     return jsonify({
-        'id': new_id,
-        'tipo': data['tipo'],
-        'categoria': data['categoria'],
-        'valor': valor,
-        'descricao': data['descricao'],
-        'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    }), 201
+        'changes': [{
+            'seq': seq,
+            'op': op,
+            'id': row_id,
+            'transacao': serializar_transacao(record),
+            'em': changed_at
+        } for seq, op, row_id, record, changed_at in rows],
+        'next_since': rows[-1][0] if rows else since,
+        'has_more': has_more
+    }), 200
 
 
-@app.delete('/api/transacoes/<int:transacao_id>')
-def delete_transacao(transacao_id):
+# =================== DASHBOARD ===================
+
+@app.get('/api/dashboard')
+@conditional_get
+@cached_json
+def get_dashboard():
+    try:
+        limite = int(request.args.get('limit', 5))
+        if not 1 <= limite <= 50:
+            raise ValueError()
+    except ValueError:
+        return jsonify({'error': 'limit deve estar entre 1 e 50'}), 400
+
     conn = get_db_connection()
-    conn.execute('DELETE FROM transactions WHERE id = ?', (transacao_id,))
-    conn.commit()
-    conn.close()
-    return jsonify({'ok': True}), 200
+
+    # Totais vindos do agregado mensal: não depende do tamanho do histórico
+    receitas, despesas, quantidade = repository.get_totals(conn)
+    ultimas = repository.list_transactions(conn, limit=limite)
+
+    return jsonify({
+        'receitas': para_reais(receitas),
+        'despesas': para_reais(despesas),
+        'saldo': para_reais(receitas - despesas),
+        'quantidade': quantidade,
+        'ultimas': [serializar_transacao(row) for row in ultimas]
+    }), 200
 
 
 # =================== EXPORTAÇÕES ===================
 
+EXPORT_CHUNK_SIZE = 500
+
+
 @app.get('/api/transacoes/export/json')
 def export_json():
-    conn = get_db_connection()
-    rows = conn.execute('SELECT * FROM transactions ORDER BY date DESC').fetchall()
-    conn.close()
+    return exportar(gerar_json, 'application/json', 'transacoes.json')
 
-    data = [{
-        'id': row['id'],
-        'data': row['date'],
-        'tipo': row['tipo'],
-        'categoria': row['categoria'],
-        'valor': row['valor'],
-        'descricao': row['descricao']
-    } for row in rows]
 
-    buf = io.BytesIO(json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
-    return send_file(buf, mimetype='application/json', as_attachment=True, download_name='transacoes.json')
+@app.get('/api/transacoes/export/ndjson')
+def export_ndjson():
+    return exportar(gerar_ndjson, 'application/x-ndjson', 'transacoes.ndjson')
 
 
 @app.get('/api/transacoes/export/csv')
 def export_csv():
-    conn = get_db_connection()
-    rows = conn.execute('SELECT * FROM transactions ORDER BY date DESC').fetchall()
-    conn.close()
+    return exportar(gerar_csv, 'text/csv', 'transacoes.csv')
+
+
+def exportar(gerador, mimetype, filename):
+    """Monta a resposta em streaming de uma exportação, com gzip opcional (?gzip=1)"""
+    try:
+        filtros = build_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # O gerador roda depois do fim do contexto da requisição, então usa o pool diretamente
+    body = gerador(iter_transacoes(get_pool(), filtros))
+    if request.args.get('gzip') in ('1', 'true'):
+        body = gzip_stream(body)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
+
+def iter_transacoes(pool, filtros):
+    """Percorre as transações filtradas em blocos de EXPORT_CHUNK_SIZE linhas"""
+    conn = pool.acquire()
+    try:
+        yield from repository.iter_transactions(conn, filtros, EXPORT_CHUNK_SIZE)
+    finally:
+        pool.release(conn)
+
+
+def gerar_csv(blocos):
+    """Gera o CSV bloco a bloco, reaproveitando o mesmo buffer pequeno"""
     output = io.StringIO()
     writer = csv.writer(output, lineterminator='\n')
+
+    # O cabeçalho sai antes da consulta, para o download começar imediatamente
     writer.writerow(['ID', 'Data', 'Tipo', 'Categoria', 'Valor', 'Descrição'])
-    for row in rows:
-        writer.writerow([row['id'], row['date'], row['tipo'], row['categoria'], row['valor'], row['descricao']])
+    yield output.getvalue().encode('utf-8')
+
+    for rows in blocos:
+        output.seek(0)
+        output.truncate()
+        for row in rows:
+            writer.writerow([row.id, row.date, row.type, row.category,
+                             formatar_centavos(row.value_cents), row.description])
+        yield output.getvalue().encode('utf-8')
+
+
+def gerar_json(blocos):
+    """Gera um array JSON compacto, codificando linha a linha"""
+    yield b'['
+    separador = ''
+    for rows in blocos:
+        partes = [json.dumps(serializar_transacao(row), ensure_ascii=False, separators=(',', ':')) for row in rows]
+        yield (separador + ','.join(partes)).encode('utf-8')
+        separador = ','
+    yield b']'
 
-    buf = io.BytesIO(output.getvalue().encode('utf-8'))
-    return send_file(buf, mimetype='text/csv', as_attachment=True, download_name='transacoes.csv')
+
+def gerar_ndjson(blocos):
+    """Gera NDJSON: um objeto JSON por linha"""
+    for rows in blocos:
+        yield ''.join(
+            json.dumps(serializar_transacao(row), ensure_ascii=False, separators=(',', ':')) + '\n'
+            for row in rows
+        ).encode('utf-8')
+
+
+def gzip_stream(chunks):
+    """Comprime um fluxo de bytes em gzip sem acumular o conteúdo"""
+    compressor = zlib.compressobj(wbits=31)  # 16 + 15: cabeçalho gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
 
 
 # =================== GRÁFICOS ===================
 
+GRANULARIDADES = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+    'year': '%Y'
+}
+
+
+def filtros_rollup(args, granularity):
+    """Traduz os filtros para o agregado mensal, quando ele consegue responder.
+
+    Devolve os argumentos de repository.monthly_totals, ou None se a consulta
+    exigir granularidade menor que o mês ou filtros que o agregado não guarda
+    (intervalos de datas arbitrários, faixas de valor).
+    """
+    if granularity not in ('month', 'year'):
+        return None
+    if any(args.get(campo) for campo in ('from', 'to', 'valor_min', 'valor_max')):
+        return None
+
+    period = args.get('period', 'all')
+    if period not in ('all', 'this_month'):
+        return None
+
+    return {
+        'period_length': 4 if granularity == 'year' else 7,
+        'type': args.get('tipo', '').strip() or None,
+        'category': args.get('categoria', '').strip() or None,
+        'month': datetime.now(timezone.utc).strftime('%Y-%m') if period == 'this_month' else None
+    }
+
+
 @app.route('/api/charts/data')
+@conditional_get
+@cached_json
 def get_charts_data():
+    try:
+        filtros = build_filters(request.args)
+        granularity = request.args.get('granularity', 'month')
+        if granularity not in GRANULARIDADES:
+            raise ValueError(f'granularity inválida: {granularity}')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     conn = get_db_connection()
-    transactions = conn.execute('SELECT * FROM transactions').fetchall()
-    conn.close()
+    rollup = filtros_rollup(request.args, granularity)
+    if rollup is not None:
+        # Lê o agregado mensal: custo proporcional a meses x categorias
+        grupos = repository.monthly_totals(conn, **rollup)
+    else:
+        # Uma única passada agrupada: só os grupos (tipo x categoria x período) chegam ao Python
+        grupos = repository.grouped_totals(conn, GRANULARIDADES[granularity], filtros)
 
-    # Gráfico de pizza
-    receitas_total = sum(t['valor'] for t in transactions if t['tipo'] == 'Receita')
-    despesas_total = sum(t['valor'] for t in transactions if t['tipo'] == 'Despesa')
+    # Soma em centavos inteiros; a conversão para reais é feita só na resposta
+    totais_por_tipo = defaultdict(int)
+    despesas_por_categoria = defaultdict(int)
+    transacoes_por_periodo = defaultdict(lambda: {'revenue': 0, 'expense': 0})
 
-    pie_data = []
-    if receitas_total > 0:
-        pie_data.append({'type': 'Receita', 'total': receitas_total})
-    if despesas_total > 0:
-        pie_data.append({'type': 'Despesa', 'total': despesas_total})
+    for tipo, categoria, periodo, total in grupos:
+        totais_por_tipo[tipo] += total
 
-    # Gráfico de barras
-    despesas_por_categoria = defaultdict(float)
-    for t in transactions:
-        if t['tipo'] == 'Despesa':
-            despesas_por_categoria[t['categoria']] += t['valor']
+        if tipo == 'Despesa':
+            despesas_por_categoria[categoria] += total
 
-    bar_data = [{'category': c, 'total': v} for c, v in despesas_por_categoria.items()]
+        # Datas que o SQLite não consegue interpretar ficam fora da série temporal
+        if periodo:
+            chave = 'revenue' if tipo == 'Receita' else 'expense'
+            transacoes_por_periodo[periodo][chave] += total
 
-    # Gráfico de linhas
-    transacoes_por_mes = defaultdict(lambda: {'revenue': 0, 'expense': 0})
-    for t in transactions:
-        try:
-            if t['date']:
-                dt = datetime.strptime(t['date'], '%Y-%m-%d %H:%M:%S')
-                mes_ano = dt.strftime('%Y-%m')
-                if t['tipo'] == 'Receita':
-                    transacoes_por_mes[mes_ano]['revenue'] += t['valor']
-                else:
-                    transacoes_por_mes[mes_ano]['expense'] += t['valor']
-        except (ValueError, TypeError):
-            continue
+    # Gráfico de pizza
+    pie_data = [{'type': t, 'total': para_reais(totais_por_tipo[t])}
+                for t in ('Receita', 'Despesa') if totais_por_tipo[t] > 0]
 
-    line_data = [{'month': m, 'revenue': v['revenue'], 'expense': v['expense']}
-                 for m, v in sorted(transacoes_por_mes.items())]
+    # Gráfico de barras
+    bar_data = [{'category': c, 'total': para_reais(v)}
+                for c, v in sorted(despesas_por_categoria.items(), key=lambda x: x[1], reverse=True)]
 
-    return jsonify({'pie': pie_data, 'bar': bar_data, 'line': line_data})
+    # Gráfico de linhas
+    line_data = [{'period': p, 'revenue': para_reais(v['revenue']), 'expense': para_reais(v['expense'])}
+                 for p, v in sorted(transacoes_por_periodo.items())]
+
+    return jsonify({'pie': pie_data, 'bar': bar_data, 'line': line_data, 'granularity': granularity})
 
 
 # =================== TESTE ===================
@@ -200,5 +1207,6 @@ def test_api():
 
 # =================== MAIN ===================
 if __name__ == '__main__':
-    init_db()
+    with app.app_context():
+        init_db()
     app.run(debug=True, port=5000)
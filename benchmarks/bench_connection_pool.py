@@ -0,0 +1,133 @@
+"""Benchmark do pool de conexões do app Flask.
+
+Mede requisições/s com leitores concorrentes e um escritor em duas
+configurações:
+
+- antes: conexão nova a cada requisição, journal em rollback e os
+  padrões do SQLite para synchronous, cache_size e mmap_size;
+- depois: pool de conexões com WAL, synchronous=NORMAL, cache e mmap.
+
+Uso:
+    python benchmarks/bench_connection_pool.py --readers 8 --seconds 5 --rows 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as finance_app  # noqa: E402
+
+CONFIGS = {
+    'antes': {
+        'SQLITE_POOL_SIZE': 0,
+        'SQLITE_JOURNAL_MODE': 'delete',
+        'SQLITE_SYNCHRONOUS': 'full',
+        'SQLITE_CACHE_SIZE': -2000,
+        'SQLITE_MMAP_SIZE': 0,
+    },
+    'depois': {
+        'SQLITE_POOL_SIZE': 8,
+        'SQLITE_JOURNAL_MODE': 'wal',
+        'SQLITE_SYNCHRONOUS': 'normal',
+        'SQLITE_CACHE_SIZE': -16000,
+        'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    },
+}
+
+READ_URLS = [
+    '/api/transacoes?limit=50',
+    '/api/transacoes?tipo=Despesa&limit=50',
+    '/api/charts/data?granularity=day&period=30days',
+]
+
+
+def prepare(database, rows, config):
+    app = finance_app.app
+    app.config.update(config, DATABASE=database)
+    old_pool = app.extensions.pop('sqlite_pool', None)
+    if old_pool is not None:
+        old_pool.close_all()
+
+    with app.app_context():
+        finance_app.init_db()
+        conn = finance_app.get_db_connection()
+        categorias = ['Alimentação', 'Transporte', 'Moradia', 'Lazer', 'Salário']
+        finance_app.repository.insert_transactions(
+            conn,
+            [(random.choice(['Receita', 'Despesa']), random.choice(categorias),
+              random.randint(100, 50000), f'bench {i}',
+              f'2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} 12:00:00')
+             for i in range(rows)]
+        )
+        conn.commit()
+
+
+def run(readers, seconds):
+    app = finance_app.app
+    stop = threading.Event()
+    counts = {'leituras': 0, 'escritas': 0, 'erros': 0}
+    lock = threading.Lock()
+
+    def reader():
+        client = app.test_client()
+        done = errors = 0
+        while not stop.is_set():
+            response = client.get(random.choice(READ_URLS))
+            if response.status_code == 200:
+                done += 1
+            else:
+                errors += 1
+        with lock:
+            counts['leituras'] += done
+            counts['erros'] += errors
+
+    def writer():
+        client = app.test_client()
+        done = errors = 0
+        while not stop.is_set():
+            response = client.post('/api/transacoes', json={
+                'tipo': 'Despesa', 'categoria': 'Lazer', 'valor': 10, 'descricao': 'bench'
+            })
+            if response.status_code == 201:
+                done += 1
+            else:
+                errors += 1
+        with lock:
+            counts['escritas'] += done
+            counts['erros'] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {k: v / seconds for k, v in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f'{args.readers} leitores + 1 escritor, {args.rows} linhas, {args.seconds}s por cenário')
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, config in CONFIGS.items():
+            prepare(os.path.join(tmp, f'{name}.db'), args.rows, config)
+            result = run(args.readers, args.seconds)
+            print(f"{name:>7}: {result['leituras']:8.1f} leituras/s  "
+                  f"{result['escritas']:7.1f} escritas/s  {result['erros']:5.1f} erros/s")
+
+
+if __name__ == '__main__':
+    main()
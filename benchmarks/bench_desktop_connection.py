@@ -0,0 +1,93 @@
+"""Benchmark da conexão persistente do DatabaseService (app desktop).
+
+Mede a latência por chamada das consultas que a interface faz a cada
+clique em duas configurações:
+
+- antes: sqlite3.connect novo a cada chamada, com os padrões do SQLite
+  (cache frio e statements preparados de novo toda vez);
+- depois: a conexão persistente do serviço, com WAL, cache_size, mmap e
+  o cache de statements.
+
+Uso:
+    python benchmarks/bench_desktop_connection.py --rows 20000 --calls 500
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services import repository  # noqa: E402
+from services.database_service import DatabaseService  # noqa: E402
+
+
+class PerCallDatabaseService(DatabaseService):
+    """Comportamento anterior: uma conexão nova, sem pragmas, por chamada"""
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def seed(path, rows):
+    conn = repository.connect(path)
+    repository.migrate(conn)
+    now = datetime.now()
+    categories = ['Alimentação', 'Transporte', 'Moradia', 'Lazer', 'Salário']
+    repository.insert_transactions(conn, [
+        (random.choice(['Receita', 'Despesa']), random.choice(categories), random.randint(100, 50000),
+         f'bench {i}', (now - timedelta(days=random.randint(0, 730))).strftime('%Y-%m-%d %H:%M:%S'))
+        for i in range(rows)
+    ])
+    conn.commit()
+    conn.close()
+
+
+def measure(fn, calls):
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--calls', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'finance.db')
+        seed(path, args.rows)
+
+        print(f'{args.rows} linhas, {args.calls} chamadas por consulta (mediana / p95 em µs)')
+        for name, cls in (('antes', PerCallDatabaseService), ('depois', DatabaseService)):
+            with cls(path) as service:
+                queries = {
+                    'resumo': service.get_financial_summary,
+                    'categorias': lambda: service.get_categories_by_type('Despesa'),
+                    'lista 30 dias': lambda: service.get_transactions_between(
+                        datetime.now() - timedelta(days=30), None),
+                }
+                for query, fn in queries.items():
+                    median, p95 = measure(fn, args.calls)
+                    print(f'{name:>7} {query:>14}: {median:9.1f} / {p95:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
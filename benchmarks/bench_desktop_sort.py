@@ -0,0 +1,55 @@
+"""Benchmark da ordenação da lista do app desktop (clique no cabeçalho).
+
+Compara, para cada coluna, o custo de um clique em duas configurações:
+
+- antes: ORDER BY da tabela inteira com get_all_transactions_sorted;
+- depois: primeira página de get_sorted_page. A primeira ordenação de
+  uma coluna monta a permutação em memória; inverter a direção só
+  percorre a mesma permutação ao contrário.
+
+Uso:
+    python benchmarks/bench_desktop_sort.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.database_service import DatabaseService  # noqa: E402
+from bench_desktop_connection import seed  # noqa: E402
+
+COLUMNS = ['id', 'date', 'type', 'category', 'value', 'description']
+
+
+def elapsed_ms(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--page', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'finance.db')
+        seed(path, args.rows)
+
+        with DatabaseService(path) as service:
+            load = elapsed_ms(lambda: service.get_sorted_page(('id', True), args.page))
+            print(f'{args.rows} linhas; carga inicial do índice em memória: {load:.1f} ms')
+            print(f"{'coluna':>12} {'antes':>10} {'1ª ordem':>10} {'inverter':>10}   (ms)")
+            for column in COLUMNS:
+                before = elapsed_ms(lambda: service.get_all_transactions_sorted(column, True))
+                first = elapsed_ms(lambda: service.get_sorted_page((column, True), args.page))
+                flip = elapsed_ms(lambda: service.get_sorted_page((column, False), args.page))
+                print(f'{column:>12} {before:10.1f} {first:10.1f} {flip:10.2f}')
+
+
+if __name__ == '__main__':
+    main()
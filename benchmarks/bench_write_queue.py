@@ -0,0 +1,83 @@
+"""Benchmark da fila de escrita com group commit.
+
+Mede escritas/s (POST /api/transacoes) com 1, 2, 4, ... clientes
+concorrentes, com cada requisição fazendo o próprio commit (fila
+desligada) e com a thread única de escrita juntando os commits.
+
+Uso:
+    python benchmarks/bench_write_queue.py --clients 1 2 4 8 16 --seconds 3 --synchronous full
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as finance_app  # noqa: E402
+
+
+def prepare(database, write_queue, synchronous):
+    app = finance_app.app
+    app.config.update(DATABASE=database, WRITE_QUEUE_ENABLED=write_queue, SQLITE_SYNCHRONOUS=synchronous)
+    for name in ('sqlite_pool', 'write_queue', 'response_cache', 'event_broker'):
+        app.extensions.pop(name, None)
+    with app.app_context():
+        finance_app.init_db()
+
+
+def run(clients, seconds):
+    app = finance_app.app
+    stop = threading.Event()
+    counts = {'escritas': 0, 'erros': 0}
+    lock = threading.Lock()
+
+    def client():
+        test_client = app.test_client()
+        done = errors = 0
+        while not stop.is_set():
+            response = test_client.post('/api/transacoes', json={
+                'tipo': 'Despesa', 'categoria': 'Lazer', 'valor': 10, 'descricao': 'bench'
+            })
+            if response.status_code == 201:
+                done += 1
+            else:
+                errors += 1
+        with lock:
+            counts['escritas'] += done
+            counts['erros'] += errors
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {k: v / seconds for k, v in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--synchronous', default='full', choices=['off', 'normal', 'full'])
+    args = parser.parse_args()
+
+    print(f'synchronous={args.synchronous}, {args.seconds}s por cenário')
+    print(f"{'clientes':>8}  {'commit por requisição':>22}  {'group commit':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for clients in args.clients:
+            linha = []
+            for write_queue in (False, True):
+                prepare(os.path.join(tmp, f'{clients}_{write_queue}.db'), write_queue, args.synchronous)
+                result = run(clients, args.seconds)
+                linha.append(f"{result['escritas']:8.1f}/s ({result['erros']:.0f} erros)")
+            print(f'{clients:>8}  {linha[0]:>22}  {linha[1]:>13}')
+
+
+if __name__ == '__main__':
+    main()
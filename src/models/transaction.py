@@ -1,12 +1,14 @@
 # models/transaction.py
 from datetime import datetime
+from services.repository import to_cents, check_value_cents
 
 
 class Transaction:
-    def __init__(self, type, category, value, date=None, description=''):
+    def __init__(self, type, category, value=None, date=None, description='', value_cents=None):
         self.type = type  # 'Receita' ou 'Despesa'
         self.category = category
-        self.value = float(value)
+        # O valor é guardado em centavos inteiros; 'value' em reais fica como propriedade
+        self.value_cents = check_value_cents(int(value_cents) if value_cents is not None else to_cents(value))
         # Agora inclui data E hora
         if date:
             self.date = date
@@ -14,6 +16,14 @@ class Transaction:
             self.date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         self.description = description
 
+    @property
+    def value(self):
+        return self.value_cents / 100
+
+    @value.setter
+    def value(self, value):
+        self.value_cents = check_value_cents(to_cents(value))
+
     def __str__(self):
         return f"<Transação tipo={self.type}, valor={self.value}, categoria={self.category}>"
 
@@ -22,6 +32,7 @@ class Transaction:
             'type': self.type,
             'category': self.category,
             'value': self.value,
+            'value_cents': self.value_cents,
             'date': self.date,
             'description': self.description
-        }
\ No newline at end of file
+        }
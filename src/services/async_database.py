@@ -0,0 +1,122 @@
+# services/async_database.py
+import functools
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDatabaseService:
+    """Fachada assíncrona do DatabaseService para a interface Tk.
+
+    Cada chamada roda em uma thread de trabalho e o resultado volta para a
+    thread do Tk por after(), então o loop da interface nunca espera o
+    SQLite. Os métodos do serviço ficam disponíveis com o mesmo nome e
+    argumentos, mais os opcionais:
+
+        db.get_financial_summary(on_done=mostrar, key='summary')
+
+    - on_done(resultado) / on_error(exceção) rodam na thread do Tk;
+    - key: um pedido novo com a mesma chave substitui o anterior (se ainda
+      está na fila é cancelado; se já está rodando, o resultado é
+      descartado), útil para reordenações e cliques repetidos.
+
+    É uma thread só, como a conexão do serviço: os pedidos rodam e as
+    respostas chegam na ordem em que foram feitos.
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, service, widget):
+        self.service = service
+        self.widget = widget
+        self.on_busy = None  # on_busy(ocupado) para indicadores de carregamento
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='database')
+        self._done = queue.SimpleQueue()
+        self._latest = {}  # chave -> pedido mais recente
+        self._pending = 0
+        self._poll_id = None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = getattr(self.service, name)
+        if not callable(method):
+            raise AttributeError(name)
+        return functools.partial(self.run, method)
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def run(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        """Agenda fn(*args, **kwargs) na thread de trabalho e devolve o Future"""
+        if key is not None:
+            self.cancel(key)
+
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.callbacks = (on_done, on_error)
+        future.key = key
+        if key is not None:
+            self._latest[key] = future
+
+        self._pending += 1
+        if self._pending == 1 and self.on_busy:
+            self.on_busy(True)
+        # Roda na thread de trabalho: só enfileira, quem entrega é o _poll
+        future.add_done_callback(self._done.put)
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(self.POLL_MS, self._poll)
+        return future
+
+    def cancel(self, key):
+        """Descarta o pedido pendente com essa chave (cancela se ainda não começou)"""
+        future = self._latest.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                future = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            self._deliver(future)
+
+        if self._pending:
+            # Um on_done pode ter feito outro pedido e já agendado o _poll
+            if self._poll_id is None:
+                self._poll_id = self.widget.after(self.POLL_MS, self._poll)
+        elif self.on_busy:
+            self.on_busy(False)
+
+    def _deliver(self, future):
+        if future.cancelled():
+            return
+        if future.key is not None:
+            if self._latest.get(future.key) is not future:
+                return  # substituído por um pedido mais novo
+            del self._latest[future.key]
+
+        on_done, on_error = future.callbacks
+        try:
+            error = future.exception()
+            if error is None:
+                if on_done:
+                    on_done(future.result())
+            elif on_error:
+                on_error(error)
+            else:
+                print(f"Erro em consulta ao banco: {error}")
+        except Exception as e:
+            # A janela que pediu pode ter sido fechada antes da resposta
+            print(f"Erro ao entregar resultado do banco: {e}")
+
+    def shutdown(self):
+        """Descarta os pedidos na fila e espera o que está rodando terminar"""
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._latest.clear()
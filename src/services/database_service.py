@@ -1,11 +1,34 @@
 # services/database_service.py
-import sqlite3
 import os
-from datetime import datetime
+import calendar
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from models.transaction import Transaction
+from utils.helpers import get_period_range
+from services import repository
+from services.repository import TransactionFilter
+from services.sort_index import SortIndex
 
 
 class DatabaseService:
+    """Fachada do app desktop sobre o repositório compartilhado com a API Flask.
+
+    O schema, as migrações e o SQL ficam em services/repository.py; aqui só
+    ficam o caminho do banco, o tratamento de erros da interface e a conversão
+    das linhas para dicionários (com 'value' em reais).
+
+    Mantém uma única conexão aberta enquanto o serviço existir: cada clique
+    reaproveita o cache de páginas e os statements já preparados. Feche com
+    close() ou use o serviço como context manager.
+    """
+
+    # Linhas mantidas pelo cache LRU de get_transaction/get_transactions
+    ROW_CACHE_SIZE = 512
+
+    # Acima disso query_transactions para de contar e devolve uma estimativa
+    COUNT_CAP = 10000
+
     def __init__(self, db_path=None):
         # Encontrar o caminho absoluto correto
         if db_path is None:
@@ -14,6 +37,11 @@ class DatabaseService:
             db_path = os.path.join(project_root, 'data', 'finance.db')
 
         self.db_path = db_path
+        self._conn = None
+        self._lock = threading.RLock()
+        self._row_cache = OrderedDict()  # id -> TransactionRecord
+        self._data_version = None
+        self._sort_index = None  # SortIndex da lista principal, montado sob demanda
         print(f"Database path: {self.db_path}")
 
         # Garantir que o diretório existe
@@ -25,7 +53,7 @@ class DatabaseService:
         self.init_database()
 
     def init_database(self):
-        """Inicializa o banco de dados com as tabelas necessárias"""
+        """Inicializa o banco de dados, aplicando as migrações pendentes do schema"""
         try:
             print(f"Tentando conectar ao banco: {self.db_path}")
 
@@ -44,146 +72,169 @@ class DatabaseService:
                 print(f"Usando fallback: {self.db_path}")
                 os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                # Tabela de transações
-                cursor.execute('''
-                               CREATE TABLE IF NOT EXISTS transactions
-                               (
-                                   id
-                                   INTEGER
-                                   PRIMARY
-                                   KEY
-                                   AUTOINCREMENT,
-                                   type
-                                   TEXT
-                                   NOT
-                                   NULL
-                                   CHECK (
-                                   type
-                                   IN
-                               (
-                                   'Receita',
-                                   'Despesa'
-                               )),
-                                   category TEXT NOT NULL,
-                                   value REAL NOT NULL,
-                                   date TEXT NOT NULL,
-                                   description TEXT,
-                                   created_at TEXT NOT NULL
-                                   )
-                               ''')
-
-                # Tabela de categorias
-                cursor.execute('''
-                               CREATE TABLE IF NOT EXISTS categories
-                               (
-                                   id
-                                   INTEGER
-                                   PRIMARY
-                                   KEY
-                                   AUTOINCREMENT,
-                                   name
-                                   TEXT
-                                   NOT
-                                   NULL
-                                   UNIQUE,
-                                   type
-                                   TEXT
-                                   NOT
-                                   NULL
-                                   CHECK (
-                                   type
-                                   IN
-                               (
-                                   'Receita',
-                                   'Despesa'
-                               ))
-                                   )
-                               ''')
-
-                # Categorias padrão
-                default_categories = [
-                    ('Salário', 'Receita'),
-                    ('Freelance', 'Receita'),
-                    ('Investimentos', 'Receita'),
-                    ('Alimentação', 'Despesa'),
-                    ('Transporte', 'Despesa'),
-                    ('Moradia', 'Despesa'),
-                    ('Lazer', 'Despesa'),
-                    ('Saúde', 'Despesa'),
-                    ('Educação', 'Despesa')
-                ]
-
-                cursor.executemany('''
-                                   INSERT
-                                   OR IGNORE INTO categories (name, type) VALUES (?, ?)
-                                   ''', default_categories)
-
-                conn.commit()
+            with self._connection() as conn:
+                repository.migrate(conn)
                 print("✅ Banco de dados inicializado com sucesso!")
 
         except Exception as e:
             print(f"❌ Erro crítico ao inicializar banco: {e}")
-            # Último fallback - banco na memória
+            # Último fallback - banco na memória (vive enquanto a conexão estiver aberta)
             print("🚨 Usando banco em memória como fallback")
+            self.close()
             self.db_path = ":memory:"
+            with self._connection() as conn:
+                repository.migrate(conn)
+
+    @contextmanager
+    def _connection(self):
+        """Conexão persistente do serviço: commit ao sair, rollback em erro"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = repository.connect(self.db_path)
+            try:
+                yield self._conn
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                # Uma escrita desfeita pode já ter entrado no índice em memória
+                self._sort_index = None
+                raise
+
+    def close(self):
+        """Fecha a conexão; a próxima chamada abre outra"""
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                # Atualiza as estatísticas do planejador que ficaram velhas durante a sessão
+                self._conn.execute("PRAGMA optimize")
+            except Exception as e:
+                print(f"Erro ao otimizar banco: {e}")
+            self._conn.close()
+            self._conn = None
+            self._row_cache.clear()
+            self._data_version = None
+            self._sort_index = None
+
+    def __enter__(self):
+        return self
 
-    def add_transaction(self, transaction: Transaction) -> bool:
-        """Adiciona uma nova transação ao banco"""
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_transaction(self, transaction: Transaction):
+        """Adiciona uma nova transação ao banco e devolve o id dela (None em erro)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                               INSERT INTO transactions (type, category, value, date, description, created_at)
-                               VALUES (?, ?, ?, ?, ?, ?)
-                               ''', (
-                                   transaction.type,
-                                   transaction.category,
-                                   transaction.value,
-                                   transaction.date,
-                                   transaction.description,
-                                   datetime.now().isoformat()
-                               ))
-                conn.commit()
-                return True
+            with self._connection() as conn:
+                transaction_id = repository.insert_transaction(
+                    conn,
+                    transaction.type,
+                    transaction.category,
+                    transaction.value_cents,
+                    transaction.description,
+                    transaction.date
+                )
+                self._update_sort_index(conn, transaction_id)
+                return transaction_id
         except Exception as e:
             print(f"Erro ao adicionar transação: {e}")
-            return False
+            return None
 
     def update_transaction(self, transaction_id, transaction_type, category, value, date, description):
         """Atualiza uma transação existente"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                               UPDATE transactions
-                               SET type        = ?,
-                                   category    = ?,
-                                   value       = ?,
-                                   date        = ?,
-                                   description = ?
-                               WHERE id = ?
-                               ''', (transaction_type, category, value, date, description, transaction_id))
-                conn.commit()
+            with self._connection() as conn:
+                self._row_cache.pop(transaction_id, None)
+                repository.update_transaction(
+                    conn, transaction_id, transaction_type, category,
+                    repository.check_value_cents(repository.to_cents(value)), date, description
+                )
+                self._update_sort_index(conn, transaction_id)
                 return True
         except Exception as e:
             print(f"Erro ao atualizar transação: {e}")
             return False
 
+    def get_transaction(self, transaction_id):
+        """Recupera uma transação pelo id, ou None se ela não existir"""
+        return self.get_transactions([transaction_id]).get(transaction_id)
+
+    def get_transactions(self, transaction_ids):
+        """Recupera várias transações pelo id: {id: transação}, só com as que existem.
+
+        As linhas lidas ficam em um cache LRU; update_transaction e
+        delete_transaction invalidam a linha alterada e escritas de outros
+        processos (a API Flask no mesmo arquivo) esvaziam o cache.
+        """
+        try:
+            with self._connection() as conn:
+                self._sync_caches(conn)
+                found, missing = {}, []
+                for transaction_id in transaction_ids:
+                    record = self._row_cache.get(transaction_id)
+                    if record is None:
+                        missing.append(transaction_id)
+                    else:
+                        self._row_cache.move_to_end(transaction_id)
+                        found[transaction_id] = record
+
+                for record in repository.get_transactions(conn, missing) if missing else []:
+                    found[record.id] = record
+                    self._row_cache[record.id] = record
+                while len(self._row_cache) > self.ROW_CACHE_SIZE:
+                    self._row_cache.popitem(last=False)
+
+                return {transaction_id: record.to_dict() for transaction_id, record in found.items()}
+        except Exception as e:
+            print(f"Erro ao buscar transações por id: {e}")
+            return {}
+
+    def _sync_caches(self, conn):
+        # PRAGMA data_version muda quando outra conexão grava no arquivo
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._row_cache.clear()
+            self._sort_index = None
+            self._data_version = data_version
+
+    def _update_sort_index(self, conn, transaction_id):
+        # Escritas deste serviço só corrigem a linha no índice já montado
+        if self._sort_index is not None:
+            self._sort_index.insert(repository.get_transaction(conn, transaction_id))
+
+    def get_sorted_page(self, sort=('id', True), limit=100, cursor=None):
+        """Uma página da lista completa, ordenada em memória.
+
+        Mesmo contrato de query_transactions sem filtros. Na primeira
+        chamada carrega as transações em um SortIndex; cada coluna é
+        ordenada uma vez e inverter a direção só percorre a mesma
+        permutação ao contrário. Escritas deste serviço atualizam o índice;
+        escritas de outro processo fazem ele ser recarregado.
+        """
+        sort_column, ascending = sort
+        try:
+            with self._connection() as conn:
+                self._sync_caches(conn)
+                if self._sort_index is None:
+                    self._sort_index = SortIndex(repository.all_transactions(conn, 'id', True))
+                records, next_cursor = self._sort_index.page(sort_column, ascending, limit, cursor)
+                total = len(self._sort_index)
+
+            return {
+                'transactions': [record.to_dict() for record in records],
+                'next_cursor': next_cursor,
+                'total': total,
+                'total_exact': True
+            }
+        except Exception as e:
+            print(f"Erro ao ordenar transações: {e}")
+            return {'transactions': [], 'next_cursor': None, 'total': 0, 'total_exact': True}
+
     def get_all_transactions(self):
         """Recupera todas as transações"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                cursor.execute('''
-                               SELECT *
-                               FROM transactions
-                               ORDER BY id DESC
-                               ''')
-                return [dict(row) for row in cursor.fetchall()]
+            with self._connection() as conn:
+                return [record.to_dict() for record in repository.all_transactions(conn)]
         except Exception as e:
             print(f"Erro ao buscar transações: {e}")
             return []
@@ -191,56 +242,123 @@ class DatabaseService:
     def get_all_transactions_sorted(self, sort_column='id', ascending=True):
         """Recupera transações ordenadas por qualquer coluna"""
         try:
-            # Mapear colunas para nomes reais no banco
-            column_mapping = {
-                'id': 'id',
-                'date': 'date',
-                'type': 'type',
-                'category': 'category',
-                'value': 'value',
-                'description': 'description'
-            }
-
-            # Validar coluna
-            if sort_column not in column_mapping:
-                sort_column = 'id'  # Fallback
+            # Colunas desconhecidas caem em 'id' (veja repository.SORTABLE_COLUMNS)
+            with self._connection() as conn:
+                return [record.to_dict() for record in repository.all_transactions(conn, sort_column, ascending)]
+        except Exception as e:
+            print(f"Erro ao buscar transações ordenadas: {e}")
+            return self.get_all_transactions()  # Fallback
 
-            # Determinar direção
-            direction = 'ASC' if ascending else 'DESC'
+    def query_transactions(self, filters=None, sort=('date', False), limit=100, cursor=None):
+        """Recupera uma página de transações com filtros e ordenação aplicados no banco.
+
+        filters aceita 'type', 'category', 'period' ('all', '30days',
+        'this_month') e 'text' (busca por descrição e categoria); sort é
+        (coluna, crescente). Devolve {'transactions', 'next_cursor', 'total',
+        'total_exact'}: next_cursor (None na última página) pede a página
+        seguinte e total, calculado só na primeira página, é exato pelo
+        agregado mensal quando só há filtros de tipo/categoria e, nos outros
+        casos, para de contar em COUNT_CAP (total_exact=False).
+        """
+        sort_column, ascending = sort
+        try:
+            repository_filters = self._build_filters(filters or {})
+            with self._connection() as conn:
+                records = repository.query_transactions(
+                    conn, repository_filters, sort_column, ascending, limit + 1, cursor
+                )
+                total = total_exact = None
+                if cursor is None:
+                    total, total_exact = repository.count_transactions(
+                        conn, repository_filters, self.COUNT_CAP
+                    )
+
+            next_cursor = None
+            if len(records) > limit:
+                records = records[:limit]
+                next_cursor = repository.sort_key(records[-1], sort_column)
 
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            return {
+                'transactions': [record.to_dict() for record in records],
+                'next_cursor': next_cursor,
+                'total': total,
+                'total_exact': total_exact
+            }
+        except Exception as e:
+            print(f"Erro ao consultar transações: {e}")
+            return {'transactions': [], 'next_cursor': None, 'total': 0, 'total_exact': True}
+
+    def _build_filters(self, filters):
+        """Traduz os filtros da interface para repository.TransactionFilter"""
+        start, end = get_period_range(filters.get('period') or 'all')
+        text = filters.get('text')
+        return TransactionFilter(
+            type=filters.get('type') or None,
+            category=filters.get('category') or None,
+            start_epoch=calendar.timegm(start.timetuple()) if start else None,
+            end_epoch=calendar.timegm(end.timetuple()) if end else None,
+            # Texto sem nenhuma palavra buscável (só pontuação) não filtra
+            match=repository.fts_query(text) if text else None
+        )
+
+    def get_transactions_between(self, start=None, end=None, transaction_type=None):
+        """Recupera transações com start <= date < end (datetime ou None para aberto), mais recentes primeiro"""
+        try:
+            filters = TransactionFilter(
+                type=transaction_type or None,
+                start_epoch=calendar.timegm(start.timetuple()) if start else None,
+                end_epoch=calendar.timegm(end.timetuple()) if end else None
+            )
+            with self._connection() as conn:
+                return [record.to_dict() for record in repository.list_transactions(conn, filters)]
+        except Exception as e:
+            print(f"Erro ao buscar transações do período: {e}")
+            return []
 
-                query = f'''
-                    SELECT * FROM transactions 
-                    ORDER BY {column_mapping[sort_column]} {direction}
-                '''
+    def get_grouped_totals(self, start=None, end=None):
+        """Totais por (tipo, categoria, mês) com start <= date < end, para os gráficos.
 
-                cursor.execute(query)
-                transactions = [dict(row) for row in cursor.fetchall()]
+        Só os grupos saem do banco: sem período, vêm do agregado mensal; com
+        período, de uma passada agrupada sobre a faixa de date_epoch.
+        """
+        try:
+            with self._connection() as conn:
+                if start is None and end is None:
+                    groups = repository.monthly_totals(conn)
+                else:
+                    groups = repository.grouped_totals(conn, '%Y-%m', TransactionFilter(
+                        start_epoch=calendar.timegm(start.timetuple()) if start else None,
+                        end_epoch=calendar.timegm(end.timetuple()) if end else None
+                    ))
+            return [{'type': type, 'category': category, 'period': period, 'total': total_cents / 100}
+                    for type, category, period, total_cents in groups if total_cents]
+        except Exception as e:
+            print(f"Erro ao agrupar transações do período: {e}")
+            return []
 
-                print(f"DEBUG - Ordenado por: {sort_column} {direction}")
-                print(f"DEBUG - IDs: {[t['id'] for t in transactions]}")
+    def search_transactions(self, text, limit=50):
+        """Busca transações por descrição e categoria, das mais relevantes para as menos.
 
-                return transactions
+        Cada palavra digitada é tratada como prefixo ("merc" acha "Mercado") e
+        todas precisam aparecer.
+        """
+        query = repository.fts_query(text)
+        if query is None:
+            return []
 
+        try:
+            with self._connection() as conn:
+                return [record.to_dict()
+                        for record, _ in repository.search_transactions(conn, query, limit=limit)]
         except Exception as e:
-            print(f"Erro ao buscar transações ordenadas: {e}")
-            return self.get_all_transactions()  # Fallback
+            print(f"Erro ao buscar transações: {e}")
+            return []
 
     def get_categories_by_type(self, type_filter=None):
         """Recupera categorias, opcionalmente filtradas por tipo"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                if type_filter:
-                    cursor.execute("SELECT name FROM categories WHERE type = ?", (type_filter,))
-                else:
-                    cursor.execute("SELECT name FROM categories")
-
-                return [row[0] for row in cursor.fetchall()]
+            with self._connection() as conn:
+                return repository.get_categories(conn, type_filter)
         except Exception as e:
             print(f"Erro ao buscar categorias: {e}")
             return []
@@ -248,27 +366,17 @@ class DatabaseService:
     def get_financial_summary(self):
         """Retorna resumo financeiro"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                               SELECT SUM(CASE WHEN type = 'Receita' THEN value ELSE 0 END) as total_revenue,
-                                      SUM(CASE WHEN type = 'Despesa' THEN value ELSE 0 END) as total_expense,
-                                      COUNT(*)                                              as transaction_count
-                               FROM transactions
-                               ''')
-
-                result = cursor.fetchone()
-                total_revenue = result[0] or 0
-                total_expense = result[1] or 0
-                balance = total_revenue - total_expense
-
-                return {
-                    'total_revenue': total_revenue,
-                    'total_expense': total_expense,
-                    'balance': balance,
-                    'transaction_count': result[2]
-                }
+            with self._connection() as conn:
+                # Lê o agregado mensal: custo proporcional a meses x categorias
+                revenue_cents, expense_cents, count = repository.get_totals(conn)
+
+            # Soma exata em centavos; conversão para reais só na saída
+            return {
+                'total_revenue': revenue_cents / 100,
+                'total_expense': expense_cents / 100,
+                'balance': (revenue_cents - expense_cents) / 100,
+                'transaction_count': count
+            }
         except Exception as e:
             print(f"Erro ao calcular resumo: {e}")
             return {
@@ -278,14 +386,25 @@ class DatabaseService:
                 'transaction_count': 0
             }
 
-    def delete_transaction(self, transaction_id: int) -> bool:
-        """Exclui uma transação"""
+    def rebuild_monthly_rollup(self) -> bool:
+        """Reconstrói o agregado mensal a partir das transações (bancos antigos ou corrompidos)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-                conn.commit()
+            with self._connection() as conn:
+                repository.rebuild_rollup(conn)
                 return True
+        except Exception as e:
+            print(f"Erro ao reconstruir agregado mensal: {e}")
+            return False
+
+    def delete_transaction(self, transaction_id: int):
+        """Exclui uma transação e devolve a transação removida (None se não existia ou em erro)"""
+        try:
+            with self._connection() as conn:
+                self._row_cache.pop(transaction_id, None)
+                record = repository.delete_transaction(conn, transaction_id)
+                if self._sort_index is not None:
+                    self._sort_index.remove(transaction_id)
+                return record.to_dict() if record is not None else None
         except Exception as e:
             print(f"Erro ao excluir transação: {e}")
-            return False
\ No newline at end of file
+            return None
\ No newline at end of file
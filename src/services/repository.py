@@ -0,0 +1,992 @@
+# services/repository.py
+"""Acesso a dados compartilhado pela API Flask (app.py) e pelo app desktop.
+
+Um único schema canônico (colunas em inglês, valores em centavos), conexões
+abertas sempre com os mesmos pragmas, SQL fixo em constantes (o cache de
+statements do sqlite3 reaproveita o plano compilado entre chamadas) e linhas
+mapeadas para TransactionRecord. Os dois frontends só traduzem nomes e
+formatos nas bordas.
+"""
+import json
+import queue
+import sqlite3
+import threading
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import NamedTuple, Optional
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,          # ms
+    'cache_size': -16000,          # negativo = KiB por conexão
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Statements preparados que cada conexão mantém (LRU do sqlite3, chaveado
+# pelo texto do SQL). Como o SQL daqui é fixo, conexões de vida longa
+# reaproveitam o plano compilado em vez de refazer o prepare a cada chamada.
+CACHED_STATEMENTS = 256
+
+DEFAULT_CATEGORIES = [
+    ('Salário', 'Receita'),
+    ('Freelance', 'Receita'),
+    ('Investimentos', 'Receita'),
+    ('Alimentação', 'Despesa'),
+    ('Transporte', 'Despesa'),
+    ('Moradia', 'Despesa'),
+    ('Lazer', 'Despesa'),
+    ('Saúde', 'Despesa'),
+    ('Educação', 'Despesa'),
+]
+
+
+# =================== CONEXÕES ===================
+
+def connect(path, check_same_thread=False, cached_statements=CACHED_STATEMENTS, **pragmas):
+    """Abre uma conexão com os pragmas de desempenho (DEFAULT_PRAGMAS + pragmas)"""
+    settings = {**DEFAULT_PRAGMAS, **pragmas}
+    conn = sqlite3.connect(
+        path,
+        timeout=settings['busy_timeout'] / 1000,
+        check_same_thread=check_same_thread,
+        cached_statements=cached_statements
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+    return conn
+
+
+class ConnectionPool:
+    """Pool de conexões SQLite reaproveitadas entre requisições.
+
+    Manter a conexão aberta preserva o cache de páginas e o cache de
+    statements preparados do sqlite3. A pilha é LIFO para que a conexão
+    mais "quente" seja a próxima a ser usada.
+    """
+
+    def __init__(self, path, size=8, **pragmas):
+        self.path = path
+        self.size = size
+        self.pragmas = pragmas
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Abre uma conexão nova já com os pragmas de desempenho"""
+        return connect(self.path, **self.pragmas)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self.connect()
+
+    def release(self, conn):
+        # Nunca devolve ao pool uma conexão com transação pendente
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if self._idle.qsize() < self.size:
+                self._idle.put_nowait(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# =================== SCHEMA ===================
+
+# date_epoch (segundos, lido do texto de date sem fuso) é calculado pelo
+# SQLite e indexado: filtros de período e a paginação comparam inteiros.
+DATE_EPOCH_COLUMN = "date_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', date) AS INTEGER)) VIRTUAL"
+
+TRANSACTIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        value_cents INTEGER NOT NULL,
+        description TEXT,
+        date TEXT DEFAULT CURRENT_TIMESTAMP,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        ''' + DATE_EPOCH_COLUMN + '''
+    )
+'''
+
+CATEGORIES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        type TEXT NOT NULL CHECK (type IN ('Receita', 'Despesa'))
+    )
+'''
+
+# Índices de transactions mantidos por sync_indexes: nome -> colunas.
+# Compostos com id para a paginação por cursor (date_epoch, id) com e sem filtros.
+INDEXES = {
+    'idx_transactions_epoch': ('date_epoch', 'id'),
+    'idx_transactions_type_epoch': ('type', 'date_epoch', 'id'),
+    'idx_transactions_category_epoch': ('category', 'date_epoch', 'id'),
+}
+
+# Totais por (mês, tipo, categoria), mantidos exatos pelos triggers.
+# Datas nulas ficam no mês '' para não violar a chave primária.
+ROLLUP_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS transactions_monthly (
+        month TEXT NOT NULL,
+        type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total_cents INTEGER NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, type, category)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_monthly_insert
+    AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO transactions_monthly (month, type, category, total_cents, count)
+        VALUES (COALESCE(substr(NEW.date, 1, 7), ''), NEW.type, NEW.category, NEW.value_cents, 1)
+        ON CONFLICT (month, type, category)
+        DO UPDATE SET total_cents = total_cents + excluded.total_cents, count = count + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_monthly_delete
+    AFTER DELETE ON transactions
+    BEGIN
+        UPDATE transactions_monthly
+        SET total_cents = total_cents - OLD.value_cents, count = count - 1
+        WHERE month = COALESCE(substr(OLD.date, 1, 7), '') AND type = OLD.type AND category = OLD.category;
+        DELETE FROM transactions_monthly
+        WHERE month = COALESCE(substr(OLD.date, 1, 7), '') AND type = OLD.type AND category = OLD.category
+          AND count <= 0;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_monthly_update
+    AFTER UPDATE OF date, type, category, value_cents ON transactions
+    BEGIN
+        UPDATE transactions_monthly
+        SET total_cents = total_cents - OLD.value_cents, count = count - 1
+        WHERE month = COALESCE(substr(OLD.date, 1, 7), '') AND type = OLD.type AND category = OLD.category;
+        INSERT INTO transactions_monthly (month, type, category, total_cents, count)
+        VALUES (COALESCE(substr(NEW.date, 1, 7), ''), NEW.type, NEW.category, NEW.value_cents, 1)
+        ON CONFLICT (month, type, category)
+        DO UPDATE SET total_cents = total_cents + excluded.total_cents, count = count + 1;
+        DELETE FROM transactions_monthly
+        WHERE month = COALESCE(substr(OLD.date, 1, 7), '') AND type = OLD.type AND category = OLD.category
+          AND count <= 0;
+    END;
+'''
+
+# Contador incrementado por qualquer escrita em transactions. Diferente de
+# PRAGMA data_version, que é por conexão, ele vale para todas as conexões.
+DATA_VERSION_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);
+
+    CREATE TRIGGER IF NOT EXISTS trg_data_version_insert AFTER INSERT ON transactions
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_data_version_update AFTER UPDATE ON transactions
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_data_version_delete AFTER DELETE ON transactions
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END;
+'''
+
+# Log de alterações (CDC) append-only: seq só cresce (AUTOINCREMENT não
+# reutiliza números nem depois da compactação). change_log_watermark guarda
+# até onde o log já foi compactado.
+CHANGE_LOG_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS transactions_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+        row_id INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS change_consumers (
+        name TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        seen_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS change_log_watermark (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO change_log_watermark (id, seq) VALUES (1, 0);
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_changes_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO transactions_changes (op, row_id, payload)
+        VALUES ('insert', NEW.id, json_object('id', NEW.id, 'type', NEW.type, 'category', NEW.category,
+                                              'value_cents', NEW.value_cents, 'description', NEW.description,
+                                              'date', NEW.date));
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_changes_update AFTER UPDATE ON transactions
+    BEGIN
+        INSERT INTO transactions_changes (op, row_id, payload)
+        VALUES ('update', NEW.id, json_object('id', NEW.id, 'type', NEW.type, 'category', NEW.category,
+                                              'value_cents', NEW.value_cents, 'description', NEW.description,
+                                              'date', NEW.date));
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_changes_delete AFTER DELETE ON transactions
+    BEGIN
+        INSERT INTO transactions_changes (op, row_id, payload)
+        VALUES ('delete', OLD.id, json_object('id', OLD.id, 'type', OLD.type, 'category', OLD.category,
+                                              'value_cents', OLD.value_cents, 'description', OLD.description,
+                                              'date', OLD.date));
+    END;
+'''
+
+# Índice FTS5 de conteúdo externo: guarda só os termos e lê o texto de
+# transactions pelo rowid. remove_diacritics faz "credito" achar "crédito";
+# prefix='2 3' mantém índices próprios para prefixos curtos.
+SEARCH_SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, category,
+        content='transactions', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO transactions_fts (rowid, description, category) VALUES (NEW.id, NEW.description, NEW.category);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete AFTER DELETE ON transactions
+    BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update AFTER UPDATE OF description, category ON transactions
+    BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+        INSERT INTO transactions_fts (rowid, description, category) VALUES (NEW.id, NEW.description, NEW.category);
+    END;
+'''
+
+CANONICAL_COLUMNS = {'id', 'type', 'category', 'value_cents', 'description', 'date', 'created_at'}
+
+# Esquemas antigos -> expressões SELECT que produzem as colunas canônicas.
+# A chave é uma coluna que só existe naquele esquema.
+LEGACY_MAPPINGS = {
+    # app.py antes do schema compartilhado (valor REAL ou valor_centavos)
+    'tipo': {
+        'type': 'tipo', 'category': 'categoria', 'description': 'descricao', 'date': 'date',
+        'created_at': 'COALESCE(date, CURRENT_TIMESTAMP)',
+    },
+    # database.db antigo (amount REAL)
+    'amount': {
+        'type': 'type', 'category': 'category', 'description': 'description', 'date': 'date',
+        'created_at': 'COALESCE(date, CURRENT_TIMESTAMP)',
+        'value_cents': 'CAST(ROUND(amount * 100) AS INTEGER)',
+    },
+    # DatabaseService antes dos centavos (value REAL)
+    'value': {
+        'type': 'type', 'category': 'category', 'description': 'description', 'date': 'date',
+        'created_at': 'created_at', 'value_cents': 'CAST(ROUND(value * 100) AS INTEGER)',
+    },
+}
+
+
+# =================== MIGRAÇÕES ===================
+
+def migrate(conn):
+    """Leva o banco até SCHEMA_VERSION aplicando só as migrações pendentes.
+
+    A versão fica em PRAGMA user_version: num banco em dia isso é tudo o que
+    roda na abertura. As pendentes são aplicadas em uma única transação
+    (BEGIN IMMEDIATE, para dois processos não migrarem ao mesmo tempo) e
+    seguidas de ANALYZE, para o planejador conhecer os índices novos.
+    Devolve True se alguma migração foi aplicada.
+    """
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+        return False
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Outro processo pode ter migrado enquanto esperávamos o lock
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {number}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    # analysis_limit limita as linhas amostradas por índice: o ANALYZE fica
+    # rápido mesmo em históricos grandes
+    conn.execute('PRAGMA analysis_limit = 1000')
+    conn.execute('ANALYZE')
+    conn.commit()
+    return True
+
+
+def _execute_script(conn, script):
+    """Como executescript, mas sem o COMMIT implícito: roda dentro da transação da migração"""
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ''
+
+
+def _has_rows(conn, table):
+    return conn.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone() is not None
+
+
+def _migration_transactions(conn):
+    """1: tabela canônica de transações (convertendo formatos antigos) e categorias"""
+    migrate_legacy_schema(conn)
+    conn.execute(TRANSACTIONS_TABLE.format(table='transactions'))
+
+    # Bancos criados antes de date_epoch: a coluna é VIRTUAL, então o ALTER
+    # TABLE é instantâneo e os índices criados em seguida fazem o backfill
+    columns = {row[1] for row in conn.execute('PRAGMA table_xinfo(transactions)')}
+    if 'date_epoch' not in columns:
+        conn.execute(f'ALTER TABLE transactions ADD COLUMN {DATE_EPOCH_COLUMN}')
+
+    conn.execute(CATEGORIES_TABLE)
+    conn.executemany('INSERT OR IGNORE INTO categories (name, type) VALUES (?, ?)', DEFAULT_CATEGORIES)
+
+
+def _migration_indexes(conn):
+    """2: índices de data, tipo+data e categoria+data"""
+    sync_indexes(conn)
+
+
+def _migration_rollup(conn):
+    """3: agregado mensal, preenchido se o banco já tinha transações"""
+    _execute_script(conn, ROLLUP_SCHEMA)
+    if _has_rows(conn, 'transactions') and not _has_rows(conn, 'transactions_monthly'):
+        conn.execute(REBUILD_ROLLUP)
+
+
+def _migration_change_tracking(conn):
+    """4: versão dos dados (ETag) e log de alterações (CDC)"""
+    _execute_script(conn, DATA_VERSION_SCHEMA)
+    _execute_script(conn, CHANGE_LOG_SCHEMA)
+
+
+def _migration_search(conn):
+    """5: índice de busca textual, preenchido se o banco já tinha transações"""
+    existed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'").fetchone()
+    _execute_script(conn, SEARCH_SCHEMA)
+    if existed is None and _has_rows(conn, 'transactions'):
+        conn.execute(REBUILD_SEARCH)
+
+
+# Em ordem; a posição na lista + 1 é a versão gravada em user_version. Bancos
+# anteriores ao controle de versão (user_version 0) passam por todas, por isso
+# cada migração aceita encontrar o que ela cria já existente. Nunca altere uma
+# migração já publicada: acrescente outra.
+MIGRATIONS = [
+    _migration_transactions,
+    _migration_indexes,
+    _migration_rollup,
+    _migration_change_tracking,
+    _migration_search,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def sync_indexes(conn):
+    """Cria os INDEXES que faltam, recria os que mudaram de colunas e remove os obsoletos.
+
+    Só mexe em índices idx_transactions_*; os automáticos (UNIQUE, PK) ficam.
+    """
+    existing = {}
+    for _, name, _, origin, _ in conn.execute('PRAGMA index_list(transactions)').fetchall():
+        if origin == 'c' and name.startswith('idx_transactions_'):
+            existing[name] = tuple(row[2] for row in conn.execute(f'PRAGMA index_info({name})'))
+
+    for name, columns in existing.items():
+        if INDEXES.get(name) != columns:
+            conn.execute(f'DROP INDEX {name}')
+    for name, columns in INDEXES.items():
+        if existing.get(name) != columns:
+            conn.execute(f"CREATE INDEX {name} ON transactions ({', '.join(columns)})")
+
+
+def migrate_legacy_schema(conn):
+    """Recria a tabela de bancos no formato antigo do app.py, do desktop ou do database.db.
+
+    Os dados são copiados com os mesmos ids e a sequência do AUTOINCREMENT é
+    preservada. Índices e triggers somem junto com a tabela antiga; o agregado
+    mensal e o índice de busca, que usavam os nomes antigos, são descartados
+    para serem recriados pelas migrações seguintes. Payloads antigos do log de
+    alterações são reescritos com as chaves canônicas. Roda dentro da
+    transação de migrate().
+    """
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(transactions)')}
+    if not columns or CANONICAL_COLUMNS <= columns:
+        return
+
+    mapping = next((LEGACY_MAPPINGS[key] for key in LEGACY_MAPPINGS if key in columns), None)
+    if mapping is None:
+        raise sqlite3.DatabaseError(f'Formato desconhecido da tabela transactions: {sorted(columns)}')
+    if 'value_cents' not in mapping:
+        mapping = dict(mapping, value_cents='valor_centavos' if 'valor_centavos' in columns
+                       else 'CAST(ROUND(valor * 100) AS INTEGER)')
+
+    targets = ['type', 'category', 'value_cents', 'description', 'date', 'created_at']
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'").fetchone()
+    conn.execute(TRANSACTIONS_TABLE.format(table='transactions_canonical'))
+    conn.execute(f'''
+        INSERT INTO transactions_canonical (id, {', '.join(targets)})
+        SELECT id, {', '.join(mapping[column] for column in targets)}
+        FROM transactions
+    ''')
+    conn.execute('DROP TABLE transactions')
+    conn.execute('ALTER TABLE transactions_canonical RENAME TO transactions')
+    # Preserva o AUTOINCREMENT: ids de linhas já excluídas não voltam a ser usados
+    if sequence:
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'transactions'")
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) "
+            "SELECT 'transactions', MAX(?, COALESCE(MAX(id), 0)) FROM transactions",
+            (sequence[0],)
+        )
+    conn.execute('DROP TABLE IF EXISTS transactions_monthly')
+    conn.execute('DROP TABLE IF EXISTS transactions_fts')
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transactions_changes'").fetchone():
+        conn.execute('''
+            UPDATE transactions_changes
+            SET payload = json_object(
+                'id', json_extract(payload, '$.id'),
+                'type', json_extract(payload, '$.tipo'),
+                'category', json_extract(payload, '$.categoria'),
+                'value_cents', COALESCE(json_extract(payload, '$.valor_centavos'),
+                                        CAST(ROUND(json_extract(payload, '$.valor') * 100) AS INTEGER)),
+                'description', json_extract(payload, '$.descricao'),
+                'date', json_extract(payload, '$.data'))
+            WHERE json_extract(payload, '$.tipo') IS NOT NULL
+        ''')
+
+
+REBUILD_ROLLUP = '''
+    INSERT INTO transactions_monthly (month, type, category, total_cents, count)
+    SELECT COALESCE(substr(date, 1, 7), ''), type, category, SUM(value_cents), COUNT(*)
+    FROM transactions
+    GROUP BY 1, 2, 3
+'''
+
+REBUILD_SEARCH = "INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')"
+
+
+def rebuild_rollup(conn):
+    """Recalcula o agregado mensal inteiro a partir da tabela de transações"""
+    conn.execute('DELETE FROM transactions_monthly')
+    conn.execute(REBUILD_ROLLUP)
+    conn.commit()
+
+
+def rebuild_search(conn):
+    """Reindexa todas as transações a partir da tabela de conteúdo"""
+    conn.execute(REBUILD_SEARCH)
+    conn.commit()
+
+
+# =================== VALORES ===================
+
+# Teto de uma transação (R$ 10 bilhões): bem abaixo do INTEGER de 64 bits do
+# SQLite, para que nem o valor nem as somas dos agregados estourem
+MAX_VALUE_CENTS = 10 ** 12
+
+CENT = Decimal('0.01')
+
+
+def to_cents(value, rounding=ROUND_HALF_UP):
+    """Converte um valor em reais (str, int, float ou Decimal) para centavos inteiros.
+
+    Passa por str() para que 0.1 vire exatamente 10 centavos. Levanta
+    ValueError para valores não numéricos ou não finitos.
+    """
+    try:
+        return int(Decimal(str(value).strip()).quantize(CENT, rounding=rounding).scaleb(2))
+    except ArithmeticError:
+        raise ValueError(f'Valor inválido: {value}')
+
+
+def check_value_cents(cents):
+    """Devolve cents se for um valor de transação válido (inteiro, 0 < cents <= MAX_VALUE_CENTS).
+
+    Vale para os dois frontends: é o que o schema consegue somar com exatidão.
+    """
+    if isinstance(cents, bool) or not isinstance(cents, int) or not 0 < cents <= MAX_VALUE_CENTS:
+        raise ValueError(f'Valor inválido: {cents}')
+    return cents
+
+
+# =================== LINHAS E FILTROS ===================
+
+class TransactionRecord(NamedTuple):
+    """Linha de transactions já tipada; 'value' (reais) é derivado de value_cents"""
+    id: int
+    type: str
+    category: str
+    value_cents: int
+    description: Optional[str]
+    date: Optional[str]
+    created_at: Optional[str] = None
+    date_epoch: Optional[int] = None
+
+    @property
+    def value(self):
+        return self.value_cents / 100
+
+    def to_dict(self):
+        row = self._asdict()
+        row['value'] = self.value
+        return row
+
+    @classmethod
+    def from_dict(cls, row):
+        return cls(**{field: row.get(field) for field in cls._fields})
+
+
+TRANSACTION_COLUMNS = 'id, type, category, value_cents, description, date, created_at, date_epoch'
+
+
+def _record_factory(cursor, row):
+    return TransactionRecord._make(row)
+
+
+def _records(conn, sql, params=()):
+    """Executa um SELECT de TRANSACTION_COLUMNS devolvendo um cursor de TransactionRecord"""
+    cursor = conn.cursor()
+    cursor.row_factory = _record_factory
+    return cursor.execute(sql, params)
+
+
+@dataclass
+class TransactionFilter:
+    """Filtros comuns às listagens, exportações, gráficos e busca.
+
+    start_epoch/end_epoch formam o intervalo [início, fim) em date_epoch;
+    min_cents/max_cents são inclusivos; match é uma consulta FTS5 (veja
+    fts_query) sobre descrição e categoria. None deixa o filtro aberto.
+    """
+    type: Optional[str] = None
+    category: Optional[str] = None
+    start_epoch: Optional[int] = None
+    end_epoch: Optional[int] = None
+    min_cents: Optional[int] = None
+    max_cents: Optional[int] = None
+    match: Optional[str] = None
+
+    def clauses(self):
+        clauses, params = [], []
+        for column, operator, value in (('type', '=', self.type),
+                                        ('category', '=', self.category),
+                                        ('date_epoch', '>=', self.start_epoch),
+                                        ('date_epoch', '<', self.end_epoch),
+                                        ('value_cents', '>=', self.min_cents),
+                                        ('value_cents', '<=', self.max_cents)):
+            if value is not None:
+                clauses.append(f'{column} {operator} ?')
+                params.append(value)
+        if self.match is not None:
+            clauses.append('id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)')
+            params.append(self.match)
+        return clauses, params
+
+    def rollup_compatible(self):
+        """True se o agregado mensal responde sozinho (só filtros de tipo e categoria)"""
+        return self.start_epoch is None and self.end_epoch is None and self.min_cents is None \
+            and self.max_cents is None and self.match is None
+
+
+def where_sql(clauses):
+    return f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+
+# =================== TRANSAÇÕES ===================
+
+INSERT_TRANSACTION = '''
+    INSERT INTO transactions (type, category, value_cents, description, date)
+    VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+
+UPDATE_TRANSACTION = '''
+    UPDATE transactions
+    SET type = ?, category = ?, value_cents = ?, date = ?, description = ?
+    WHERE id = ?
+'''
+
+SORTABLE_COLUMNS = {
+    'id': 'id',
+    'date': 'date_epoch',
+    'type': 'type',
+    'category': 'category',
+    'value': 'value_cents',
+    'description': 'description',
+}
+
+
+def insert_transaction(conn, type, category, value_cents, description, date=None):
+    """Insere uma transação e devolve o id; sem date vale o CURRENT_TIMESTAMP (UTC)"""
+    return conn.execute(INSERT_TRANSACTION, (type, category, value_cents, description, date)).lastrowid
+
+
+def insert_transactions(conn, rows):
+    """Insere (type, category, value_cents, description, date) em lote e devolve o último id.
+
+    Dentro da mesma transação de escrita os ids AUTOINCREMENT são
+    consecutivos, então o primeiro é ultimo - len(rows) + 1.
+    """
+    conn.executemany(INSERT_TRANSACTION, rows)
+    return conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+
+def update_transaction(conn, transaction_id, type, category, value_cents, date, description):
+    return conn.execute(UPDATE_TRANSACTION,
+                        (type, category, value_cents, date, description, transaction_id)).rowcount
+
+
+def delete_transaction(conn, transaction_id):
+    """Exclui a transação e devolve o TransactionRecord removido (ou None)"""
+    record = get_transaction(conn, transaction_id)
+    if record is not None:
+        conn.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
+    return record
+
+
+def get_transaction(conn, transaction_id):
+    return _records(conn, f'SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id = ?',
+                    (transaction_id,)).fetchone()
+
+
+def get_transactions(conn, transaction_ids, chunk_size=500):
+    """TransactionRecord dos ids pedidos (os inexistentes ficam de fora).
+
+    Os ids vão em blocos de chunk_size para não estourar o limite de
+    parâmetros do SQLite; cada bloco é uma busca pela chave primária.
+    """
+    transaction_ids = list(transaction_ids)
+    records = []
+    for start in range(0, len(transaction_ids), chunk_size):
+        chunk = transaction_ids[start:start + chunk_size]
+        records.extend(_records(conn, f'''
+            SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id IN ({','.join('?' * len(chunk))})
+        ''', chunk))
+    return records
+
+
+def list_transactions(conn, filters=None, limit=None, after=None):
+    """Transações da mais recente para a mais antiga, por (date_epoch, id).
+
+    after é a chave (date_epoch, id) da última linha da página anterior
+    (paginação por cursor); limit=None devolve tudo. Linhas sem data vêm
+    por último, como no ORDER BY do SQLite.
+    """
+    clauses, params = (filters or TransactionFilter()).clauses()
+
+    def page(step_clauses, step_params, step_limit):
+        sql = f'''
+            SELECT {TRANSACTION_COLUMNS} FROM transactions
+            {where_sql(clauses + step_clauses)}
+            ORDER BY date_epoch DESC, id DESC
+        '''
+        if step_limit is not None:
+            sql += ' LIMIT ?'
+            step_params = step_params + [step_limit]
+        return _records(conn, sql, params + step_params).fetchall()
+
+    return _keyset_pages(page, _keyset_steps('date_epoch', False, after), limit)
+
+
+def query_transactions(conn, filters=None, sort_column='date', ascending=False, limit=100, after=None):
+    """Uma página de transações filtradas e ordenadas por uma das SORTABLE_COLUMNS.
+
+    O id desempata a ordenação e after é a chave (valor da coluna, id) da
+    última linha da página anterior (veja sort_key). Linhas com a coluna
+    nula vêm antes na ordem crescente e depois na decrescente, como no
+    ORDER BY do SQLite.
+    """
+    column = SORTABLE_COLUMNS.get(sort_column, 'id')
+    direction = 'ASC' if ascending else 'DESC'
+    clauses, params = (filters or TransactionFilter()).clauses()
+
+    def page(step_clauses, step_params, step_limit):
+        return _records(conn, f'''
+            SELECT {TRANSACTION_COLUMNS} FROM transactions
+            {where_sql(clauses + step_clauses)}
+            ORDER BY {column} {direction}, id {direction}
+            LIMIT ?
+        ''', params + step_params + [step_limit]).fetchall()
+
+    return _keyset_pages(page, _keyset_steps(column, ascending, after), limit)
+
+
+def sort_key(record, sort_column):
+    """Chave do cursor de query_transactions para a linha"""
+    return getattr(record, SORTABLE_COLUMNS.get(sort_column, 'id')), record.id
+
+
+def _keyset_steps(column, ascending, after):
+    """Trechos [(cláusulas, parâmetros)] que, lidos em ordem, continuam a paginação.
+
+    A comparação de row values (coluna, id) < (?, ?) é o que deixa o SQLite
+    buscar direto no índice, mas ela nunca é verdadeira para NULL. Por isso
+    as linhas com a coluna nula (primeiras na ordem crescente, últimas na
+    decrescente) são um trecho separado, em vez de um OR que obrigaria a
+    percorrer o índice desde o começo.
+    """
+    if after is None:
+        return [([], [])]
+    value, row_id = after
+    if column == 'id':
+        return [(['id > ?' if ascending else 'id < ?'], [row_id])]
+    if ascending:
+        if value is None:
+            return [([f'{column} IS NULL', 'id > ?'], [row_id]), ([f'{column} IS NOT NULL'], [])]
+        return [([f'({column}, id) > (?, ?)'], [value, row_id])]
+    if value is None:
+        return [([f'{column} IS NULL', 'id < ?'], [row_id])]
+    return [([f'({column}, id) < (?, ?)'], [value, row_id]), ([f'{column} IS NULL'], [])]
+
+
+def _keyset_pages(page, steps, limit):
+    """Junta os trechos de _keyset_steps; o seguinte só é lido se a página ficou curta"""
+    rows = []
+    for step_clauses, step_params in steps:
+        remaining = None if limit is None else limit - len(rows)
+        if remaining == 0:
+            break
+        rows.extend(page(step_clauses, step_params, remaining))
+    return rows
+
+
+def count_transactions(conn, filters=None, cap=None):
+    """(total, exato) das transações que passam pelos filtros.
+
+    Só com tipo/categoria a contagem sai exata do agregado mensal, sem
+    limite; nos outros casos percorre o índice e para em cap linhas
+    (exato=False quando chegou lá).
+    """
+    filters = filters or TransactionFilter()
+    clauses, params = filters.clauses()
+    if filters.rollup_compatible():
+        total = conn.execute(f'SELECT SUM(count) FROM transactions_monthly {where_sql(clauses)}',
+                             params).fetchone()[0] or 0
+        return total, True
+
+    limit = '' if cap is None else f'LIMIT {int(cap)}'
+    total = conn.execute(f'SELECT COUNT(*) FROM (SELECT 1 FROM transactions {where_sql(clauses)} {limit})',
+                         params).fetchone()[0]
+    return total, cap is None or total < cap
+
+
+def all_transactions(conn, sort_column='id', ascending=False):
+    """Todas as transações ordenadas por uma das SORTABLE_COLUMNS (id desempata)"""
+    column = SORTABLE_COLUMNS.get(sort_column, 'id')
+    direction = 'ASC' if ascending else 'DESC'
+    return _records(conn, f'''
+        SELECT {TRANSACTION_COLUMNS} FROM transactions ORDER BY {column} {direction}, id {direction}
+    ''').fetchall()
+
+
+def iter_transactions(conn, filters=None, chunk_size=500):
+    """Percorre as transações filtradas em blocos de chunk_size, sem carregar tudo"""
+    clauses, params = (filters or TransactionFilter()).clauses()
+    cursor = _records(conn, f'''
+        SELECT {TRANSACTION_COLUMNS} FROM transactions {where_sql(clauses)} ORDER BY date_epoch DESC, id DESC
+    ''', params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def get_categories(conn, type=None):
+    if type:
+        rows = conn.execute('SELECT name FROM categories WHERE type = ?', (type,))
+    else:
+        rows = conn.execute('SELECT name FROM categories')
+    return [row[0] for row in rows]
+
+
+def get_data_version(conn):
+    return conn.execute('SELECT version FROM data_version WHERE id = 1').fetchone()[0]
+
+
+# =================== AGREGADOS ===================
+
+def get_totals(conn):
+    """(receitas, despesas, quantidade) em centavos, lidos do agregado mensal"""
+    row = conn.execute('''
+        SELECT SUM(CASE WHEN type = 'Receita' THEN total_cents ELSE 0 END),
+               SUM(CASE WHEN type = 'Despesa' THEN total_cents ELSE 0 END),
+               SUM(count)
+        FROM transactions_monthly
+    ''').fetchone()
+    return row[0] or 0, row[1] or 0, row[2] or 0
+
+
+def monthly_totals(conn, period_length=7, type=None, category=None, month=None):
+    """Totais (type, category, period, total_cents) a partir do agregado mensal.
+
+    period_length=7 agrupa por mês (aaaa-mm), 4 por ano. Custo proporcional a
+    meses x categorias, não ao número de transações.
+    """
+    clauses, params = [], []
+    for column, value in (('type', type), ('category', category), ('month', month)):
+        if value is not None:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+    return conn.execute(f'''
+        SELECT type, category, substr(month, 1, {int(period_length)}) AS period, SUM(total_cents) AS total_cents
+        FROM transactions_monthly
+        {where_sql(clauses)}
+        GROUP BY type, category, period
+    ''', params).fetchall()
+
+
+def grouped_totals(conn, period_format, filters=None):
+    """Totais (type, category, period, total_cents) em uma passada agrupada sobre transactions"""
+    clauses, params = (filters or TransactionFilter()).clauses()
+    return conn.execute(f'''
+        SELECT type, category, strftime(?, date) AS period, SUM(value_cents) AS total_cents
+        FROM transactions
+        {where_sql(clauses)}
+        GROUP BY type, category, period
+    ''', [period_format] + params).fetchall()
+
+
+# =================== BUSCA TEXTUAL ===================
+
+def fts_query(text):
+    """Transforma o texto digitado em uma consulta FTS5, ou None se não houver termos.
+
+    Cada palavra vira um prefixo entre aspas ("merc"* acha "mercado") e todas
+    precisam aparecer; aspas e operadores digitados são tratados como texto.
+    """
+    terms = [term.replace('"', '""') for term in text.split() if any(c.isalnum() for c in term)]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_transactions(conn, query, filters=None, limit=None, after=None, order='rank'):
+    """Busca por descrição e categoria; devolve [(TransactionRecord, rank)].
+
+    order='rank' ordena por relevância (bm25, menor é melhor) e after é a
+    chave (rank, id); order='date' segue a ordem da listagem e after é
+    (date_epoch, id). query é uma consulta FTS5 (veja fts_query).
+    """
+    clauses, params = (filters or TransactionFilter()).clauses()
+    if order == 'rank':
+        ordering = 'm.rank, t.id'
+        steps = [([], []) if after is None else (['(m.rank, id) > (?, ?)'], list(after))]
+    else:
+        ordering = 'date_epoch DESC, t.id DESC'
+        steps = _keyset_steps('date_epoch', False, after)
+    cursor = conn.cursor()
+    cursor.row_factory = None
+
+    def page(step_clauses, step_params, step_limit):
+        sql = f'''
+            SELECT {', '.join('t.' + column for column in TRANSACTION_COLUMNS.split(', '))}, m.rank
+            FROM (SELECT rowid AS fts_id, rank FROM transactions_fts WHERE transactions_fts MATCH ?) AS m
+            CROSS JOIN transactions AS t ON t.id = m.fts_id
+            {where_sql(clauses + step_clauses)}
+            ORDER BY {ordering}
+        '''
+        # A subconsulta só expõe rowid e rank, para os filtros valerem sem
+        # ambiguidade sobre as colunas de transactions. O CROSS JOIN fixa o FTS
+        # como laço externo: sem ele o planejador pode percorrer transactions pelo
+        # índice de tipo e refazer o MATCH linha a linha.
+        if step_limit is not None:
+            sql += ' LIMIT ?'
+            step_params = step_params + [step_limit]
+        return [(TransactionRecord._make(row[:-1]), row[-1])
+                for row in cursor.execute(sql, [query] + params + step_params)]
+
+    return _keyset_pages(page, steps, limit)
+
+
+def search_snippets(conn, query, ids, start_marker, end_marker, tokens=12):
+    """Trechos destacados {id: snippet} só para os ids pedidos.
+
+    O FTS percorre a faixa de rowids dos ids (barato) e o "+rowid IN" é
+    filtrado fora dele: passado ao FTS como restrição, cada id viraria uma
+    nova execução do MATCH.
+    """
+    if not ids:
+        return {}
+    return dict(conn.execute(f'''
+        SELECT rowid, snippet(transactions_fts, -1, ?, ?, '…', ?)
+        FROM transactions_fts
+        WHERE transactions_fts MATCH ? AND rowid BETWEEN ? AND ? AND +rowid IN ({','.join('?' * len(ids))})
+    ''', [start_marker, end_marker, tokens, query, min(ids), max(ids)] + list(ids)).fetchall())
+
+
+# =================== LOG DE ALTERAÇÕES (CDC) ===================
+
+def register_consumer(conn, name, seq):
+    """Registra que o consumidor já processou o log até seq"""
+    conn.execute('''
+        INSERT INTO change_consumers (name, seq) VALUES (?, ?)
+        ON CONFLICT (name) DO UPDATE SET seq = MAX(seq, excluded.seq), seen_at = CURRENT_TIMESTAMP
+    ''', (name, seq))
+
+
+def get_change_watermark(conn):
+    return conn.execute('SELECT seq FROM change_log_watermark WHERE id = 1').fetchone()[0]
+
+
+def compact_changes(conn, consumer_ttl_days):
+    """Apaga o trecho do log que todos os consumidores ativos já leram.
+
+    Devolve o novo watermark. Sem consumidores registrados nada é apagado.
+    Não faz commit: roda dentro da transação de escrita de quem chama.
+    """
+    conn.execute(
+        "DELETE FROM change_consumers WHERE seen_at < datetime('now', ?)",
+        (f'-{int(consumer_ttl_days)} days',)
+    )
+    watermark = conn.execute('SELECT MIN(seq) FROM change_consumers').fetchone()[0]
+    current = get_change_watermark(conn)
+    if watermark is not None and watermark > current:
+        conn.execute('DELETE FROM transactions_changes WHERE seq <= ?', (watermark,))
+        conn.execute('UPDATE change_log_watermark SET seq = ? WHERE id = 1', (watermark,))
+        current = watermark
+    return current
+
+
+def list_changes(conn, since, limit):
+    """Alterações com seq > since: [(seq, op, row_id, TransactionRecord, changed_at)]"""
+    return [(seq, op, row_id, TransactionRecord.from_dict(json.loads(payload)), changed_at)
+            for seq, op, row_id, payload, changed_at in conn.execute(
+                'SELECT seq, op, row_id, payload, changed_at FROM transactions_changes '
+                'WHERE seq > ? ORDER BY seq LIMIT ?', (since, limit))]
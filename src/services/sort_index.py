@@ -0,0 +1,105 @@
+# services/sort_index.py
+import bisect
+from operator import itemgetter
+
+from services.repository import SORTABLE_COLUMNS, TransactionRecord
+
+
+class SortIndex:
+    """Transações em memória com uma permutação ordenada por coluna.
+
+    Cada permutação é a lista de ids em ordem crescente de (coluna, id),
+    com NULL antes de qualquer valor, como o ORDER BY do SQLite. Ela só é
+    montada no primeiro pedido daquela coluna; a ordem decrescente é a
+    mesma lista percorrida de trás para frente. insert/remove mantêm as
+    permutações já montadas com busca binária, sem reordenar.
+    """
+
+    def __init__(self, records=()):
+        self.records = {record.id: record for record in records}
+        self.orders = {}  # coluna -> [ids]
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def _key(value, transaction_id):
+        return value is not None, value, transaction_id
+
+    def _key_function(self, column):
+        records = self.records
+        if column == 'id':
+            return lambda transaction_id: transaction_id
+        index = TransactionRecord._fields.index(column)
+        return lambda transaction_id: (records[transaction_id][index] is not None,
+                                       records[transaction_id][index], transaction_id)
+
+    def order(self, sort_column):
+        """Permutação crescente de uma das SORTABLE_COLUMNS"""
+        return self._order(SORTABLE_COLUMNS.get(sort_column, 'id'))
+
+    def _order(self, column):
+        # Montada na primeira vez que a coluna é pedida
+        order = self.orders.get(column)
+        if order is None:
+            if column == 'id':
+                order = sorted(self.records)
+            else:
+                # sorted é estável: partindo da ordem por id, ordenar só pelo
+                # valor já desempata por id, sem montar uma tupla por linha
+                index = TransactionRecord._fields.index(column)
+                by_id = [self.records[transaction_id] for transaction_id in self._order('id')]
+                order = [record.id for record in by_id if record[index] is None]
+                order.extend(record.id for record in sorted(
+                    (record for record in by_id if record[index] is not None), key=itemgetter(index)
+                ))
+            self.orders[column] = order
+        return order
+
+    def page(self, sort_column, ascending, limit, cursor=None):
+        """Uma página na ordem pedida: (registros, próximo cursor ou None).
+
+        O cursor é o mesmo de repository.query_transactions, (valor, id) da
+        última linha, então a lista pagina igual nos dois caminhos.
+        """
+        column = SORTABLE_COLUMNS.get(sort_column, 'id')
+        order = self._order(column)
+        key = self._key_function(column)
+        if cursor is not None:
+            cursor_key = cursor[1] if column == 'id' else self._key(*cursor)
+
+        if ascending:
+            start = 0 if cursor is None else bisect.bisect_right(order, cursor_key, key=key)
+            ids = order[start:start + limit]
+            has_more = start + limit < len(order)
+        else:
+            end = len(order) if cursor is None else bisect.bisect_left(order, cursor_key, key=key)
+            ids = order[max(0, end - limit):end][::-1]
+            has_more = end - limit > 0
+
+        records = [self.records[transaction_id] for transaction_id in ids]
+        next_cursor = None
+        if has_more and records:
+            next_cursor = getattr(records[-1], column), records[-1].id
+        return records, next_cursor
+
+    def insert(self, record):
+        """Inclui (ou substitui) uma transação nas permutações já montadas"""
+        self.remove(record.id)
+        self.records[record.id] = record
+        for column, order in self.orders.items():
+            bisect.insort(order, record.id, key=self._key_function(column))
+
+    def remove(self, transaction_id):
+        """Tira uma transação; ids desconhecidos são ignorados"""
+        record = self.records.get(transaction_id)
+        if record is None:
+            return
+        for column, order in self.orders.items():
+            key = self._key_function(column)
+            position = bisect.bisect_left(order, key(transaction_id), key=key)
+            if position < len(order) and order[position] == transaction_id:
+                del order[position]
+            else:
+                order.remove(transaction_id)
+        del self.records[transaction_id]
@@ -6,10 +6,11 @@ from utils.validators import validate_datetime_br, convert_datetime_br_to_db, va
 
 
 class AddTransactionWindow(ctk.CTkToplevel):
-    def __init__(self, parent, db_service, on_save_callback=None):
+    def __init__(self, parent, db, on_save_callback=None):
         super().__init__(parent)
         self.parent = parent
-        self.db_service = db_service
+        self.db = db  # AsyncDatabaseService
+        # on_save_callback(op, antes, depois): a linha alterada, não um "recarregue tudo"
         self.on_save_callback = on_save_callback
 
         self.title("Adicionar Transação")
@@ -92,9 +93,14 @@ class AddTransactionWindow(ctk.CTkToplevel):
         self.category_combobox.bind("<Button-1>", open_dropdown(self.category_combobox))
 
     def load_categories(self):
-        """Carrega categorias baseadas no tipo selecionado"""
-        transaction_type = self.type_var.get()
-        categories = self.db_service.get_categories_by_type(transaction_type)
+        """Pede as categorias do tipo selecionado"""
+        self.db.get_categories_by_type(self.type_var.get(), on_done=self.set_categories,
+                                       key=('categories', id(self)))
+
+    def set_categories(self, categories):
+        """Preenche o combobox quando as categorias chegam do banco"""
+        if not self.winfo_exists():
+            return
         self.category_combobox.configure(values=categories)
         if categories:
             self.category_combobox.set(categories[0])
@@ -149,18 +155,36 @@ class AddTransactionWindow(ctk.CTkToplevel):
                 description=description
             )
 
-            success = self.db_service.add_transaction(transaction)
+            # Insere e lê a linha nova (pela chave primária) na thread do banco
+            service = self.db.service
 
-            if success:
-                if self.on_save_callback:
-                    self.on_save_callback()
-                self.destroy()
-            else:
-                self.show_error("Erro ao salvar transação.")
+            def insert():
+                transaction_id = service.add_transaction(transaction)
+                return service.get_transaction(transaction_id) if transaction_id else None
+
+            self.save_button.configure(state='disabled', text="Salvando...")
+            self.db.run(insert, on_done=self.on_saved, on_error=self.on_save_error)
 
         except Exception as e:
             self.show_error(f"Erro: {str(e)}")
 
+    def on_saved(self, inserted):
+        """Resposta do banco para save_transaction"""
+        if inserted is None:
+            self.on_save_error(None)
+            return
+        if self.on_save_callback:
+            # Avisa só a linha nova
+            self.on_save_callback('insert', None, inserted)
+        if self.winfo_exists():
+            self.destroy()
+
+    def on_save_error(self, error):
+        if not self.winfo_exists():
+            return
+        self.save_button.configure(state='normal', text="Salvar")
+        self.show_error("Erro ao salvar transação.")
+
     def show_error(self, message):
         """Exibe mensagem de erro"""
         error_window = ctk.CTkToplevel(self)
@@ -174,11 +198,12 @@ class AddTransactionWindow(ctk.CTkToplevel):
 
 
 class EditTransactionWindow(ctk.CTkToplevel):
-    def __init__(self, parent, db_service, transaction_data, on_save_callback=None):
+    def __init__(self, parent, db, transaction_data, on_save_callback=None):
         super().__init__(parent)
         self.parent = parent
-        self.db_service = db_service
+        self.db = db  # AsyncDatabaseService
         self.transaction_data = transaction_data
+        # on_save_callback(op, antes, depois), como na AddTransactionWindow
         self.on_save_callback = on_save_callback
         self.transaction_id = transaction_data['id']
 
@@ -278,9 +303,14 @@ class EditTransactionWindow(ctk.CTkToplevel):
             self.show_error(f"Erro ao carregar dados: {e}")
 
     def load_categories(self):
-        """Carrega categorias baseadas no tipo selecionado"""
-        transaction_type = self.type_var.get()
-        categories = self.db_service.get_categories_by_type(transaction_type)
+        """Pede as categorias do tipo selecionado"""
+        self.db.get_categories_by_type(self.type_var.get(), on_done=self.set_categories,
+                                       key=('categories', id(self)))
+
+    def set_categories(self, categories):
+        """Preenche o combobox quando as categorias chegam do banco"""
+        if not self.winfo_exists():
+            return
         self.category_combobox.configure(values=categories)
 
         # Manter a categoria atual selecionada
@@ -327,28 +357,46 @@ class EditTransactionWindow(ctk.CTkToplevel):
                 self.show_error("Por favor, selecione uma categoria.")
                 return
 
-            # Atualizar transação
-            success = self.db_service.update_transaction(
-                self.transaction_id,
-                transaction_type,
-                category,
-                amount_value,
-                datetime_db,
-                description
-            )
+            # Atualiza e relê a linha na thread do banco
+            service = self.db.service
+            transaction_id = self.transaction_id
 
-            if success:
-                if self.on_save_callback:
-                    self.on_save_callback()
-                self.destroy()
-                from tkinter import messagebox
-                messagebox.showinfo("Sucesso", "Transação atualizada com sucesso!")
-            else:
-                self.show_error("Erro ao atualizar transação.")
+            def update():
+                success = service.update_transaction(
+                    transaction_id,
+                    transaction_type,
+                    category,
+                    amount_value,
+                    datetime_db,
+                    description
+                )
+                return service.get_transaction(transaction_id) if success else None
+
+            self.save_button.configure(state='disabled', text="Salvando...")
+            self.db.run(update, on_done=self.on_updated, on_error=self.on_update_error)
 
         except Exception as e:
             self.show_error(f"Erro: {str(e)}")
 
+    def on_updated(self, updated):
+        """Resposta do banco para update_transaction"""
+        if updated is None:
+            self.on_update_error(None)
+            return
+        if self.on_save_callback:
+            # Avisa a linha antes e depois da edição
+            self.on_save_callback('update', self.transaction_data, updated)
+        if self.winfo_exists():
+            self.destroy()
+        from tkinter import messagebox
+        messagebox.showinfo("Sucesso", "Transação atualizada com sucesso!")
+
+    def on_update_error(self, error):
+        if not self.winfo_exists():
+            return
+        self.save_button.configure(state='normal', text="Atualizar")
+        self.show_error("Erro ao atualizar transação.")
+
     def show_error(self, message):
         """Exibe mensagem de erro"""
         error_window = ctk.CTkToplevel(self)
@@ -3,13 +3,13 @@ import customtkinter as ctk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter.messagebox as messagebox
-from datetime import datetime, timedelta
+from utils.helpers import get_period_range
 
 
 class ChartsWindow(ctk.CTkToplevel):
-    def __init__(self, parent, db_service):
+    def __init__(self, parent, db):
         super().__init__(parent)
-        self.db_service = db_service
+        self.db = db  # AsyncDatabaseService
         self.parent = parent
 
         # Configurações da janela
@@ -95,68 +95,51 @@ class ChartsWindow(ctk.CTkToplevel):
         self.update_chart()
 
     def update_chart(self):
-        """Atualiza o gráfico baseado nas seleções"""
+        """Pede os dados do período selecionado; o gráfico é desenhado quando chegam"""
+        self.show_chart_message("⏳ Carregando dados...")
+        # Cliques repetidos substituem o pedido anterior
+        # Os totais são agrupados na thread do banco; só os grupos chegam aqui
+        start, end = get_period_range(self.period.get())
+        self.db.get_grouped_totals(start, end, on_done=self.draw_chart,
+                                   key=('chart', id(self)))
+
+    def show_chart_message(self, text):
+        """Troca o conteúdo do frame do gráfico por uma mensagem"""
+        for widget in self.chart_frame.winfo_children():
+            widget.destroy()
+        ctk.CTkLabel(self.chart_frame, text=text, font=ctk.CTkFont(size=16)).pack(expand=True)
+
+    def draw_chart(self, groups):
+        """Desenha o gráfico com os totais por (tipo, categoria, mês) do período"""
+        if not self.winfo_exists():
+            return
         try:
+            if not groups:
+                self.show_chart_message("📊 Não há dados suficientes para gerar gráficos")
+                return
+
             # Limpar frame do gráfico
             for widget in self.chart_frame.winfo_children():
                 widget.destroy()
 
-            # Buscar dados
-            transactions = self.db_service.get_all_transactions()
-
-            if not transactions:
-                ctk.CTkLabel(self.chart_frame, text="📊 Não há dados suficientes para gerar gráficos",
-                             font=ctk.CTkFont(size=16)).pack(expand=True)
-                return
-
-            # Filtrar por período se necessário
-            transactions = self.filter_by_period(transactions)
-
             # Criar gráfico baseado no tipo selecionado
             chart_type = self.chart_type.get()
 
             if chart_type == "pie":
-                self.create_pie_chart(transactions)
+                self.create_pie_chart(groups)
             elif chart_type == "bar":
-                self.create_bar_chart(transactions)
+                self.create_bar_chart(groups)
             elif chart_type == "line":
-                self.create_line_chart(transactions)
+                self.create_line_chart(groups)
 
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao gerar gráfico: {e}")
 
-    def filter_by_period(self, transactions):
-        """Filtra transações pelo período selecionado"""
-        period = self.period.get()
-
-        if period == "all":
-            return transactions
-
-        now = datetime.now()
-        filtered = []
-
-        for transaction in transactions:
-            try:
-                # Converter data da transação
-                trans_date = datetime.strptime(transaction['date'][:10], '%Y-%m-%d')
-
-                if period == "30days":
-                    if now - trans_date <= timedelta(days=30):
-                        filtered.append(transaction)
-                elif period == "this_month":
-                    if trans_date.year == now.year and trans_date.month == now.month:
-                        filtered.append(transaction)
-
-            except:
-                filtered.append(transaction)  # Incluir se não conseguir converter data
-
-        return filtered
-
-    def create_pie_chart(self, transactions):
+    def create_pie_chart(self, groups):
         """Cria gráfico de pizza - Receitas vs Despesas"""
         # Calcular totais
-        total_receitas = sum(t['value'] for t in transactions if t['type'] == 'Receita')
-        total_despesas = sum(t['value'] for t in transactions if t['type'] == 'Despesa')
+        total_receitas = sum(g['total'] for g in groups if g['type'] == 'Receita')
+        total_despesas = sum(g['total'] for g in groups if g['type'] == 'Despesa')
 
         if total_receitas == 0 and total_despesas == 0:
             ctk.CTkLabel(self.chart_frame, text="📊 Não há dados para o gráfico",
@@ -189,16 +172,16 @@ class ChartsWindow(ctk.CTkToplevel):
 
         self.embed_chart(fig)
 
-    def create_bar_chart(self, transactions):
+    def create_bar_chart(self, groups):
         """Cria gráfico de barras - Gastos por categoria"""
         # Agrupar despesas por categoria
         categorias = {}
-        for transaction in transactions:
-            if transaction['type'] == 'Despesa':
-                categoria = transaction['category']
+        for group in groups:
+            if group['type'] == 'Despesa':
+                categoria = group['category']
                 if categoria not in categorias:
                     categorias[categoria] = 0
-                categorias[categoria] += transaction['value']
+                categorias[categoria] += group['total']
 
         if not categorias:
             ctk.CTkLabel(self.chart_frame, text="📊 Não há despesas para mostrar",
@@ -236,23 +219,22 @@ class ChartsWindow(ctk.CTkToplevel):
 
         self.embed_chart(fig)
 
-    def create_line_chart(self, transactions):
+    def create_line_chart(self, groups):
         """Cria gráfico de linhas - Evolução mensal"""
         # Agrupar por mês
         meses = {}
-        for transaction in transactions:
-            try:
-                # Extrair ano-mês da data
-                data_parts = transaction['date'][:7]  # YYYY-MM
-                if data_parts not in meses:
-                    meses[data_parts] = {'receitas': 0, 'despesas': 0}
-
-                if transaction['type'] == 'Receita':
-                    meses[data_parts]['receitas'] += transaction['value']
-                else:
-                    meses[data_parts]['despesas'] += transaction['value']
-            except:
+        for group in groups:
+            # Transações sem data válida ficam fora da série temporal
+            mes = group['period']  # YYYY-MM
+            if not mes:
                 continue
+            if mes not in meses:
+                meses[mes] = {'receitas': 0, 'despesas': 0}
+
+            if group['type'] == 'Receita':
+                meses[mes]['receitas'] += group['total']
+            else:
+                meses[mes]['despesas'] += group['total']
 
         if len(meses) < 2:
             ctk.CTkLabel(self.chart_frame,
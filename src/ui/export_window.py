@@ -6,12 +6,13 @@ from datetime import datetime
 import os
 import csv
 import json
+from utils.helpers import get_period_range
 
 
 class ExportWindow(ctk.CTkToplevel):
-    def __init__(self, parent, db_service):
+    def __init__(self, parent, db):
         super().__init__(parent)
-        self.db_service = db_service
+        self.db = db  # AsyncDatabaseService
         self.parent = parent
 
         # Configurações da janela
@@ -101,7 +102,7 @@ class ExportWindow(ctk.CTkToplevel):
         button_frame.pack(fill="x", pady=(20, 10))
 
         # Botão Exportar (grande e destacado)
-        export_btn = ctk.CTkButton(
+        self.export_btn = ctk.CTkButton(
             button_frame,
             text="📁 EXPORTAR AGORA",
             command=self.export_data,
@@ -110,7 +111,7 @@ class ExportWindow(ctk.CTkToplevel):
             height=40,
             font=ctk.CTkFont(weight="bold", size=14)
         )
-        export_btn.pack(fill="x", pady=(0, 10))
+        self.export_btn.pack(fill="x", pady=(0, 10))
 
         # Botão Cancelar
         cancel_btn = ctk.CTkButton(
@@ -180,80 +181,69 @@ class ExportWindow(ctk.CTkToplevel):
             if not filepath:
                 return  # Usuário cancelou
 
+            # O aviso sobre .pdf precisa do Tk: é respondido antes de gravar
+            if format_type == "pdf" and filepath.lower().endswith('.pdf') and not self.confirm_pdf_extension():
+                filepath = filepath.replace('.pdf', '.txt')
+
             print(f"📁 Exportando para: {filepath}")
 
-            # Buscar dados do banco
-            transactions = self.db_service.get_all_transactions()
-            summary = self.db_service.get_financial_summary()
-
-            if not transactions:
-                messagebox.showwarning("Aviso", "Não há transações para exportar.")
-                return
-
-            # Mostrar mensagem de processamento
-            self.withdraw()  # Esconde a janela temporariamente
-
-            # Exportar baseado no formato
-            success = False
-            if format_type == "csv":
-                success = self.export_to_csv(filepath, transactions, summary)
-            elif format_type == "json":
-                success = self.export_to_json(filepath, transactions, summary)
-            elif format_type == "pdf":
-                success = self.export_to_pdf(filepath, transactions, summary)
-
-            if success:
-                # Mensagem de sucesso já foi mostrada nos métodos específicos
-                self.destroy()
-            else:
-                self.deiconify()  # Mostra a janela novamente
-                messagebox.showerror("Erro", "Falha ao exportar os dados.")
+            # Variáveis do Tk só são lidas aqui; a consulta e a gravação do
+            # arquivo rodam na thread do banco
+            start, end = get_period_range(self.period_var.get())
+            options = {
+                'include_summary': self.include_summary.get(),
+                'include_transactions': self.include_transactions.get()
+            }
+            writer = {"csv": self.export_to_csv, "json": self.export_to_json, "pdf": self.export_to_pdf}[format_type]
+            service = self.db.service
+
+            def export():
+                transactions = service.get_transactions_between(start, end)
+                if not transactions:
+                    return False
+                writer(filepath, transactions, service.get_financial_summary(), **options)
+                return True
+
+            self.export_btn.configure(state='disabled', text="⏳ Exportando...")
+            self.db.run(export, on_done=lambda exported: self.on_export_done(filepath, format_type, exported),
+                        on_error=self.on_export_error)
 
         except Exception as e:
-            self.deiconify()  # Mostra a janela novamente em caso de erro
             messagebox.showerror("Erro", f"Erro ao exportar dados: {str(e)}")
             print(f"❌ Erro detalhado: {e}")
 
-    def generate_filename(self, format_type):
-        """Gera nome do arquivo com timestamp"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        extensions = {
-            "csv": "csv",
-            "json": "json",
-            "pdf": "pdf"
-        }
-        return f"financas_{timestamp}.{extensions[format_type]}"
-
-    def export_to_csv(self, filepath, transactions, summary):
-        """Exporta dados para CSV"""
-        try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file, delimiter=';')
-
-                # Escrever resumo
-                if self.include_summary.get():
-                    writer.writerow(["RESUMO FINANCEIRO"])
-                    writer.writerow(["Receitas Total:", f"R$ {summary['total_revenue']:.2f}"])
-                    writer.writerow(["Despesas Total:", f"R$ {summary['total_expense']:.2f}"])
-                    writer.writerow(["Saldo:", f"R$ {summary['balance']:.2f}"])
-                    writer.writerow([])
-                    writer.writerow([])
-
-                # Escrever transações
-                if self.include_transactions.get():
-                    writer.writerow(["TRANSAÇÕES"])
-                    writer.writerow(["ID", "Data", "Tipo", "Categoria", "Valor", "Descrição"])
-
-                    for transaction in transactions:
-                        writer.writerow([
-                            transaction['id'],
-                            transaction['date'],
-                            transaction['type'],
-                            transaction['category'],
-                            f"R$ {transaction['value']:.2f}",
-                            transaction['description'] or ''
-                        ])
+    def confirm_pdf_extension(self):
+        """Pergunta se o texto formatado deve mesmo ser salvo com extensão .pdf"""
+        return messagebox.askyesno(
+            "Aviso - Formato PDF",
+            "📄 O arquivo será salvo como TEXTO FORMATADO com extensão .pdf\n\n"
+            "Isso significa que:\n"
+            "• ✅ Funciona perfeitamente em editores de texto\n"
+            "• ❌ Pode não abrir em navegadores/leitores PDF\n\n"
+            "Recomendamos usar a extensão .txt para melhor compatibilidade.\n\n"
+            "Deseja continuar com .pdf mesmo assim?"
+        )
 
+    def on_export_error(self, error):
+        print(f"❌ Erro ao exportar: {error}")
+        if not self.winfo_exists():
+            return
+        self.export_btn.configure(state='normal', text="📁 EXPORTAR AGORA")
+        messagebox.showerror("Erro", f"Falha ao exportar os dados: {error}")
+
+    def on_export_done(self, filepath, format_type, exported):
+        """Mostra o resultado quando o arquivo já foi gravado pela thread do banco"""
+        if not self.winfo_exists():
+            return
+        self.export_btn.configure(state='normal', text="📁 EXPORTAR AGORA")
+        if not exported:
+            messagebox.showwarning("Aviso", "Não há transações para exportar.")
+            return
+
+        print(f"✅ {format_type.upper()} exportado: {filepath}")
+        self.withdraw()  # Esconde a janela enquanto a mensagem é exibida
+
+        if format_type == "csv":
             messagebox.showinfo(
                 "✅ CSV Exportado",
                 f"📊 Arquivo CSV salvo com sucesso!\n\n"
@@ -261,33 +251,7 @@ class ExportWindow(ctk.CTkToplevel):
                 f"Local: {filepath}\n\n"
                 "📖 Pode ser aberto no Excel ou qualquer editor"
             )
-            print(f"✅ CSV exportado: {filepath}")
-            return True
-
-        except Exception as e:
-            print(f"❌ Erro ao exportar CSV: {e}")
-            return False
-
-    def export_to_json(self, filepath, transactions, summary):
-        """Exporta dados para JSON"""
-        try:
-            export_data = {
-                "export_info": {
-                    "export_date": datetime.now().isoformat(),
-                    "total_transactions": len(transactions),
-                    "format": "FinanceTracker Export"
-                }
-            }
-
-            if self.include_summary.get():
-                export_data["summary"] = summary
-
-            if self.include_transactions.get():
-                export_data["transactions"] = transactions
-
-            with open(filepath, 'w', encoding='utf-8') as file:
-                json.dump(export_data, file, indent=2, ensure_ascii=False, default=str)
-
+        elif format_type == "json":
             messagebox.showinfo(
                 "✅ JSON Exportado",
                 f"📄 Arquivo JSON salvo com sucesso!\n\n"
@@ -295,129 +259,152 @@ class ExportWindow(ctk.CTkToplevel):
                 f"Local: {filepath}\n\n"
                 "📖 Pode ser usado para integrações e APIs"
             )
-            print(f"✅ JSON exportado: {filepath}")
-            return True
+        elif filepath.lower().endswith('.pdf'):
+            messagebox.showinfo(
+                "Exportação Concluída",
+                f"📄 Arquivo salvo como: {os.path.basename(filepath)}\n\n"
+                "💡 Este é um arquivo de TEXTO com extensão .pdf\n"
+                "📖 Para abrir: Use Bloco de Notas, VS Code ou Word\n"
+                "❌ Navegadores podem não abrir corretamente\n\n"
+                "Sugestão: Na próxima vez use a extensão .txt"
+            )
+        else:
+            messagebox.showinfo(
+                "✅ Exportação Concluída",
+                f"📄 Arquivo de texto salvo com sucesso!\n\n"
+                f"Arquivo: {os.path.basename(filepath)}\n"
+                f"Local: {filepath}\n\n"
+                "📖 Pode ser aberto em qualquer editor de texto"
+            )
 
-        except Exception as e:
-            print(f"❌ Erro ao exportar JSON: {e}")
-            return False
+        self.destroy()
 
-    def export_to_pdf(self, filepath, transactions, summary):
-        """Exporta dados para PDF/Texto formatado"""
-        try:
-            # Verificar se o usuário escolheu .pdf mesmo sabendo que é texto
-            is_pdf_extension = filepath.lower().endswith('.pdf')
-
-            # Se for .pdf, avisar o usuário
-            if is_pdf_extension:
-                result = messagebox.askyesno(
-                    "Aviso - Formato PDF",
-                    "📄 O arquivo será salvo como TEXTO FORMATADO com extensão .pdf\n\n"
-                    "Isso significa que:\n"
-                    "• ✅ Funciona perfeitamente em editores de texto\n"
-                    "• ❌ Pode não abrir em navegadores/leitores PDF\n\n"
-                    "Recomendamos usar a extensão .txt para melhor compatibilidade.\n\n"
-                    "Deseja continuar com .pdf mesmo assim?"
-                )
-
-                if not result:
-                    # Usuário quer mudar para .txt
-                    new_filepath = filepath.replace('.pdf', '.txt')
-                    return self.export_to_pdf(new_filepath, transactions, summary)
-
-            with open(filepath, 'w', encoding='utf-8') as file:
-                # Cabeçalho do relatório
-                file.write("╔" + "═" * 58 + "╗\n")
-                file.write("║                RELATÓRIO FINANCEIRO                ║\n")
-                file.write("║                 OrçaFácil                    ║\n")
-                file.write("╚" + "═" * 58 + "╝\n\n")
-
-                # Informações da exportação
-                file.write(f"📅 Data de exportação: {datetime.now().strftime('%d/%m/%Y às %H:%M')}\n")
-                file.write(f"📊 Total de transações: {len(transactions)}\n\n")
-
-                # Resumo financeiro
-                if self.include_summary.get():
-                    file.write("┌─ RESUMO FINANCEIRO ──────────────────────────────────┐\n")
-                    file.write("│                                                    │\n")
-
-                    # Calcular larguras para alinhamento
-                    receita = f"R$ {summary['total_revenue']:,.2f}".replace(',', 'X').replace('.', ',').replace('X',
-                                                                                                                '.')
-                    despesa = f"R$ {summary['total_expense']:,.2f}".replace(',', 'X').replace('.', ',').replace('X',
-                                                                                                                '.')
-                    saldo = f"R$ {summary['balance']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-
-                    file.write(f"│    💰 Receitas Total: {receita:>20}    │\n")
-                    file.write(f"│    💸 Despesas Total: {despesa:>20}    │\n")
-                    file.write(f"│    ⚖️  Saldo Final:   {saldo:>20}    │\n")
-                    file.write("│                                                    │\n")
-                    file.write("└────────────────────────────────────────────────────┘\n\n")
-
-                # Transações
-                if self.include_transactions.get():
-                    file.write("┌─ LISTA DE TRANSAÇÕES ───────────────────────────────┐\n")
-                    file.write("│ ID  Data        Tipo     Categoria      Valor       Descrição       │\n")
-                    file.write("├─────────────────────────────────────────────────────┤\n")
-
-                    for transaction in transactions:
-                        # Formatar data (apenas data, não hora)
-                        data_br = transaction['date'][:10]  # Apenas data
-
-                        # Formatar valor
-                        valor = transaction['value']
-                        if transaction['type'] == 'Receita':
-                            valor_str = f"+R$ {valor:7.2f}"
-                            simbolo = "⬆️"
-                        else:
-                            valor_str = f"-R$ {valor:7.2f}"
-                            simbolo = "⬇️"
-
-                        # Formatar moeda brasileira
-                        valor_str = valor_str.replace('.', ',')
-
-                        # Limitar tamanho dos campos
-                        categoria = transaction['category'][:12].ljust(12)
-                        descricao = (transaction['description'] or '')[:15].ljust(15)
-
-                        # Escrever linha formatada
-                        file.write(
-                            f"│ {transaction['id']:2}  {data_br}  {simbolo}  {categoria}  {valor_str:>9}  {descricao} │\n")
-
-                    file.write("└─────────────────────────────────────────────────────┘\n\n")
-
-                # Rodapé
-                file.write("\n" + "─" * 60 + "\n")
-                file.write("Relatório gerado automaticamente pelo OrçaFácil\n")
-                file.write("💙 Controle suas finanças com facilidade!\n")
-                file.write("─" * 60 + "\n")
-
-            print(f"✅ Arquivo de texto exportado: {filepath}")
-
-            # Mensagem final baseada na extensão
-            if is_pdf_extension:
-                messagebox.showinfo(
-                    "Exportação Concluída",
-                    f"📄 Arquivo salvo como: {os.path.basename(filepath)}\n\n"
-                    "💡 Este é um arquivo de TEXTO com extensão .pdf\n"
-                    "📖 Para abrir: Use Bloco de Notas, VS Code ou Word\n"
-                    "❌ Navegadores podem não abrir corretamente\n\n"
-                    "Sugestão: Na próxima vez use a extensão .txt"
-                )
-            else:
-                messagebox.showinfo(
-                    "✅ Exportação Concluída",
-                    f"📄 Arquivo de texto salvo com sucesso!\n\n"
-                    f"Arquivo: {os.path.basename(filepath)}\n"
-                    f"Local: {filepath}\n\n"
-                    "📖 Pode ser aberto em qualquer editor de texto"
-                )
-
-            return True
+    def generate_filename(self, format_type):
+        """Gera nome do arquivo com timestamp"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extensions = {
+            "csv": "csv",
+            "json": "json",
+            "pdf": "pdf"
+        }
+        return f"financas_{timestamp}.{extensions[format_type]}"
 
-        except Exception as e:
-            print(f"❌ Erro ao exportar arquivo de texto: {e}")
-            return False
+    def export_to_csv(self, filepath, transactions, summary, include_summary=True, include_transactions=True):
+        """Exporta dados para CSV (roda na thread do banco: não toca no Tk)"""
+        with open(filepath, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file, delimiter=';')
+
+            # Escrever resumo
+            if include_summary:
+                writer.writerow(["RESUMO FINANCEIRO"])
+                writer.writerow(["Receitas Total:", f"R$ {summary['total_revenue']:.2f}"])
+                writer.writerow(["Despesas Total:", f"R$ {summary['total_expense']:.2f}"])
+                writer.writerow(["Saldo:", f"R$ {summary['balance']:.2f}"])
+                writer.writerow([])
+                writer.writerow([])
+
+            # Escrever transações
+            if include_transactions:
+                writer.writerow(["TRANSAÇÕES"])
+                writer.writerow(["ID", "Data", "Tipo", "Categoria", "Valor", "Descrição"])
+
+                for transaction in transactions:
+                    writer.writerow([
+                        transaction['id'],
+                        transaction['date'],
+                        transaction['type'],
+                        transaction['category'],
+                        f"R$ {transaction['value']:.2f}",
+                        transaction['description'] or ''
+                    ])
+
+    def export_to_json(self, filepath, transactions, summary, include_summary=True, include_transactions=True):
+        """Exporta dados para JSON (roda na thread do banco: não toca no Tk)"""
+        export_data = {
+            "export_info": {
+                "export_date": datetime.now().isoformat(),
+                "total_transactions": len(transactions),
+                "format": "FinanceTracker Export"
+            }
+        }
+
+        if include_summary:
+            export_data["summary"] = summary
+
+        if include_transactions:
+            export_data["transactions"] = transactions
+
+        with open(filepath, 'w', encoding='utf-8') as file:
+            json.dump(export_data, file, indent=2, ensure_ascii=False, default=str)
+
+    def export_to_pdf(self, filepath, transactions, summary, include_summary=True, include_transactions=True):
+        """Exporta dados para PDF/Texto formatado (roda na thread do banco: não toca no Tk)"""
+        with open(filepath, 'w', encoding='utf-8') as file:
+            # Cabeçalho do relatório
+            file.write("╔" + "═" * 58 + "╗\n")
+            file.write("║                RELATÓRIO FINANCEIRO                ║\n")
+            file.write("║                 OrçaFácil                    ║\n")
+            file.write("╚" + "═" * 58 + "╝\n\n")
+
+            # Informações da exportação
+            file.write(f"📅 Data de exportação: {datetime.now().strftime('%d/%m/%Y às %H:%M')}\n")
+            file.write(f"📊 Total de transações: {len(transactions)}\n\n")
+
+            # Resumo financeiro
+            if include_summary:
+                file.write("┌─ RESUMO FINANCEIRO ──────────────────────────────────┐\n")
+                file.write("│                                                    │\n")
+
+                # Calcular larguras para alinhamento
+                receita = f"R$ {summary['total_revenue']:,.2f}".replace(',', 'X').replace('.', ',').replace('X',
+                                                                                                            '.')
+                despesa = f"R$ {summary['total_expense']:,.2f}".replace(',', 'X').replace('.', ',').replace('X',
+                                                                                                            '.')
+                saldo = f"R$ {summary['balance']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+                file.write(f"│    💰 Receitas Total: {receita:>20}    │\n")
+                file.write(f"│    💸 Despesas Total: {despesa:>20}    │\n")
+                file.write(f"│    ⚖️  Saldo Final:   {saldo:>20}    │\n")
+                file.write("│                                                    │\n")
+                file.write("└────────────────────────────────────────────────────┘\n\n")
+
+            # Transações
+            if include_transactions:
+                file.write("┌─ LISTA DE TRANSAÇÕES ───────────────────────────────┐\n")
+                file.write("│ ID  Data        Tipo     Categoria      Valor       Descrição       │\n")
+                file.write("├─────────────────────────────────────────────────────┤\n")
+
+                for transaction in transactions:
+                    # Formatar data (apenas data, não hora)
+                    data_br = (transaction['date'] or '')[:10]  # Apenas data
+
+                    # Formatar valor
+                    valor = transaction['value']
+                    if transaction['type'] == 'Receita':
+                        valor_str = f"+R$ {valor:7.2f}"
+                        simbolo = "⬆️"
+                    else:
+                        valor_str = f"-R$ {valor:7.2f}"
+                        simbolo = "⬇️"
+
+                    # Formatar moeda brasileira
+                    valor_str = valor_str.replace('.', ',')
+
+                    # Limitar tamanho dos campos
+                    categoria = transaction['category'][:12].ljust(12)
+                    descricao = (transaction['description'] or '')[:15].ljust(15)
+
+                    # Escrever linha formatada
+                    file.write(
+                        f"│ {transaction['id']:2}  {data_br}  {simbolo}  {categoria}  {valor_str:>9}  {descricao} │\n")
+
+                file.write("└─────────────────────────────────────────────────────┘\n\n")
+
+            # Rodapé
+            file.write("\n" + "─" * 60 + "\n")
+            file.write("Relatório gerado automaticamente pelo OrçaFácil\n")
+            file.write("💙 Controle suas finanças com facilidade!\n")
+            file.write("─" * 60 + "\n")
 
 
 if __name__ == "__main__":
@@ -427,7 +414,7 @@ if __name__ == "__main__":
 
 
     class MockDBService:
-        def get_all_transactions(self):
+        def get_transactions_between(self, start=None, end=None):
             return [
                 {'id': 1, 'date': '2024-10-18 10:00:00', 'type': 'Receita', 'category': 'Salário', 'value': 2500.00,
                  'description': 'Salário mensal'},
@@ -439,5 +426,6 @@ if __name__ == "__main__":
             return {'total_revenue': 2500.00, 'total_expense': 45.50, 'balance': 2454.50}
 
 
-    export_win = ExportWindow(app, MockDBService())
+    from services.async_database import AsyncDatabaseService
+    export_win = ExportWindow(app, AsyncDatabaseService(MockDBService(), app))
     app.mainloop()
\ No newline at end of file
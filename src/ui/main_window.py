@@ -1,7 +1,9 @@
 # ui/main_window.py
 import customtkinter as ctk
 from ui.add_transaction_window import AddTransactionWindow, EditTransactionWindow
+from ui.virtual_list import VirtualTransactionList
 from services.database_service import DatabaseService
+from services.async_database import AsyncDatabaseService
 import tkinter.messagebox as messagebox
 from datetime import datetime
 
@@ -10,11 +12,17 @@ class MainWindow(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.db_service = DatabaseService()
+        # Toda consulta da interface passa pela thread de trabalho
+        self.db = AsyncDatabaseService(self.db_service, self)
+        self.db.on_busy = self.show_busy
 
         # Variáveis para ordenação
         self.current_sort_column = 'id'
         self.sort_ascending = True
 
+        # Totais em centavos por tipo; escritas aplicam só a diferença
+        self.totals_cents = {'Receita': 0, 'Despesa': 0}
+
         # Configuração da janela
         self.title("■ OrçaFácil")
         self.geometry("1200x650")
@@ -27,6 +35,9 @@ class MainWindow(ctk.CTk):
         self.create_widgets()
         self.update_display()
 
+        # Fecha a conexão do banco junto com a janela
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def create_widgets(self):
         """Cria todos os widgets da interface"""
         # Frame principal
@@ -104,50 +115,29 @@ class MainWindow(ctk.CTk):
         self.tree_frame = ctk.CTkFrame(transactions_frame)
         self.tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
-        # Scrollable frame para as transações
-        self.scrollable_frame = ctk.CTkScrollableFrame(self.tree_frame)
-        self.scrollable_frame.pack(fill='both', expand=True)
-
-    def create_transactions_header(self):
-        """Cria o cabeçalho clicável da tabela"""
-        header_frame = ctk.CTkFrame(self.scrollable_frame)
-        header_frame.pack(fill='x', pady=5)
-
-        # Colunas clicáveis
-        columns = [
-            ('ID', 'id'),
-            ('Data/Hora', 'date'),
-            ('Tipo', 'type'),
-            ('Categoria', 'category'),
-            ('Valor', 'value'),
-            ('Descrição', 'description'),
-            ('Ações', 'actions')
-        ]
-
-        for i, (display_name, column_name) in enumerate(columns):
-            if column_name != 'actions':  # Ações não é clicável
-                btn = ctk.CTkButton(
-                    header_frame,
-                    text=display_name,
-                    font=('Arial', 12, 'bold'),
-                    width=120 if column_name == 'date' else (100 if column_name != 'description' else 150),
-                    height=30,
-                    command=lambda col=column_name: self.sort_transactions(col)
-                )
-                btn.grid(row=0, column=i, padx=2, pady=2, sticky='ew')
-            else:
-                # Coluna Ações não é clicável
-                label = ctk.CTkLabel(
-                    header_frame,
-                    text=display_name,
-                    font=('Arial', 12, 'bold'),
-                    width=80
-                )
-                label.grid(row=0, column=i, padx=2, pady=2)
-
-        # Configurar pesos das colunas para melhor distribuição
-        for i in range(len(columns)):
-            header_frame.grid_columnconfigure(i, weight=1)
+        # Lista virtualizada: só as linhas visíveis existem como widgets
+        self.transactions_list = VirtualTransactionList(
+            self.tree_frame,
+            fetch_page=self.fetch_transactions_page,
+            format_row=self.format_transaction_row,
+            on_sort=self.sort_transactions,
+            on_edit=self.edit_transaction,
+            on_delete=self.delete_transaction,
+            fg_color="transparent"
+        )
+        self.transactions_list.pack(fill='both', expand=True)
+        self.transactions_list.set_sort(self.current_sort_column, self.sort_ascending)
+
+    def fetch_transactions_page(self, cursor, limit, on_page):
+        """Pede uma página da lista na ordenação atual (ordenada em memória)"""
+        # Mesma chave: uma reordenação rápida descarta a página que ficou velha
+        self.db.get_sorted_page(
+            sort=(self.current_sort_column, self.sort_ascending),
+            limit=limit,
+            cursor=cursor,
+            on_done=on_page,
+            key='list-page'
+        )
 
     def sort_transactions(self, column):
         """Ordena as transações pela coluna clicada"""
@@ -161,20 +151,21 @@ class MainWindow(ctk.CTk):
             self.current_sort_column = column
             self.sort_ascending = True
 
-        # Atualizar a exibição
-        self.update_transactions_list()
+        # Nova ordenação recomeça do topo
+        self.transactions_list.set_sort(self.current_sort_column, self.sort_ascending)
+        self.update_transactions_list(keep_position=False)
 
         print(f"📊 Ordem: {column} {'↑' if self.sort_ascending else '↓'}")
 
     def open_add_transaction(self):
         """Abre janela para adicionar transação"""
-        AddTransactionWindow(self, self.db_service, on_save_callback=self.update_display)
+        AddTransactionWindow(self, self.db, on_save_callback=self.apply_change)
 
     def open_charts(self):
         """Abre janela de gráficos"""
         try:
             from ui.charts_window import ChartsWindow
-            ChartsWindow(self, self.db_service)
+            ChartsWindow(self, self.db)
         except ImportError as e:
             messagebox.showerror("Erro", f"Biblioteca de gráficos não disponível: {e}")
         except Exception as e:
@@ -182,23 +173,19 @@ class MainWindow(ctk.CTk):
 
     def edit_transaction(self, transaction_id):
         """Abre janela para editar transação existente"""
-        try:
-            # Buscar transação pelo ID
-            transactions = self.db_service.get_all_transactions()
-            transaction_to_edit = None
-
-            for transaction in transactions:
-                if transaction['id'] == transaction_id:
-                    transaction_to_edit = transaction
-                    break
+        # Busca só a linha pedida (pela chave primária ou pelo cache de linhas)
+        self.db.get_transaction(transaction_id, on_done=self.open_edit_transaction, key='edit')
 
+    def open_edit_transaction(self, transaction_to_edit):
+        """Abre a janela de edição quando a transação chega do banco"""
+        try:
             if transaction_to_edit:
                 # Abrir janela de edição
                 EditTransactionWindow(
                     self,
-                    self.db_service,
+                    self.db,
                     transaction_to_edit,
-                    on_save_callback=self.update_display
+                    on_save_callback=self.apply_change
                 )
             else:
                 messagebox.showerror("Erro", "Transação não encontrada!")
@@ -211,58 +198,59 @@ class MainWindow(ctk.CTk):
         self.update_summary()
         self.update_transactions_list()
 
-    def update_summary(self):
-        """Atualiza o resumo financeiro"""
-        try:
-            summary = self.db_service.get_financial_summary()
+    def apply_change(self, op, old, new):
+        """Aplica uma escrita (insert/update/delete) sem recarregar resumo e lista
 
-            # Formatação BR
-            self.revenue_label.configure(text=f"Receitas: {self.format_currency_brl(summary['total_revenue'])}")
-            self.expense_label.configure(text=f"Despesas: {self.format_currency_brl(summary['total_expense'])}")
-            self.balance_label.configure(text=f"Saldo: {self.format_currency_brl(summary['balance'])}")
+        old e new são a linha antes e depois; o resumo recebe só a
+        diferença e a lista só encaixa a linha alterada.
+        """
+        for transaction, sign in ((old, -1), (new, 1)):
+            if transaction is not None and transaction['type'] in self.totals_cents:
+                self.totals_cents[transaction['type']] += sign * transaction['value_cents']
+        self.show_summary()
+        self.transactions_list.apply_change(op, old, new)
 
-            # Cor do saldo
-            if summary['balance'] >= 0:
-                self.balance_label.configure(text_color="green")
-            else:
-                self.balance_label.configure(text_color="red")
+    def update_summary(self):
+        """Pede o resumo financeiro; os rótulos mudam quando ele chega"""
+        self.db.get_financial_summary(on_done=self.set_summary, key='summary')
 
+    def set_summary(self, summary):
+        """Guarda e mostra o resumo lido do banco"""
+        try:
+            # O resumo vem em reais, derivado de centavos exatos
+            self.totals_cents = {
+                'Receita': round(summary['total_revenue'] * 100),
+                'Despesa': round(summary['total_expense'] * 100)
+            }
+            self.show_summary()
         except Exception as e:
             print(f"Erro ao atualizar resumo: {e}")
 
-    def update_transactions_list(self):
-        """Atualiza a lista de transações com ordenação - CORRIGIDO PARA EVITAR SOBREPOSIÇÃO"""
-        try:
-            # LIMPEZA COMPLETA do scrollable_frame - CORREÇÃO PRINCIPAL
-            for widget in self.scrollable_frame.winfo_children():
-                widget.destroy()
-
-            # Criar cabeçalho clicável
-            self.create_transactions_header()
-
-            # Buscar transações com ordenação
-            transactions = self.db_service.get_all_transactions_sorted(
-                self.current_sort_column,
-                self.sort_ascending
-            )
+    def show_busy(self, busy):
+        """Cursor de espera enquanto há consultas em andamento"""
+        self.configure(cursor='watch' if busy else '')
 
-            if not transactions:
-                # Mensagem centralizada quando não há transações
-                no_data_frame = ctk.CTkFrame(self.scrollable_frame)
-                no_data_frame.pack(expand=True, fill='both', pady=50)
+    def show_summary(self):
+        """Mostra os totais guardados em self.totals_cents"""
+        revenue = self.totals_cents['Receita'] / 100
+        expense = self.totals_cents['Despesa'] / 100
+        balance = (self.totals_cents['Receita'] - self.totals_cents['Despesa']) / 100
 
-                ctk.CTkLabel(no_data_frame,
-                             text="Nenhuma transação encontrada.",
-                             font=('Arial', 14)).pack(expand=True)
-                return
+        # Formatação BR
+        self.revenue_label.configure(text=f"Receitas: {self.format_currency_brl(revenue)}")
+        self.expense_label.configure(text=f"Despesas: {self.format_currency_brl(expense)}")
+        self.balance_label.configure(text=f"Saldo: {self.format_currency_brl(balance)}")
 
-            # Adicionar transações - CORRIGIDO: criar uma linha por vez
-            for transaction in transactions:
-                self.create_transaction_row(transaction)
-
-            # Forçar atualização da interface
-            self.scrollable_frame.update_idletasks()
+        # Cor do saldo
+        if balance >= 0:
+            self.balance_label.configure(text_color="green")
+        else:
+            self.balance_label.configure(text_color="red")
 
+    def update_transactions_list(self, keep_position=True):
+        """Atualiza a lista de transações; busca só as páginas até a área visível"""
+        try:
+            self.transactions_list.refresh(keep_position)
         except Exception as e:
             print(f"Erro ao atualizar lista de transações: {e}")
             messagebox.showerror("Erro", f"Erro ao carregar transações: {e}")
@@ -302,101 +290,58 @@ class MainWindow(ctk.CTk):
         widget.bind("<Enter>", on_enter)
         widget.bind("<Leave>", on_leave)
 
-    def create_transaction_row(self, transaction):
-        """Cria uma linha para transação - COM BOTÕES EDITAR (TEXTO) E EXCLUIR (ÍCONE)"""
-        try:
-            row_frame = ctk.CTkFrame(self.scrollable_frame)
-            row_frame.pack(fill='x', pady=1)
-
-            # Lógica de cores e sinais
-            if transaction['type'] == 'Receita':
-                color = "green"
-                value_text = f"+{self.format_currency_brl(transaction['value'])}"
-            else:  # Despesa
-                color = "red"
-                value_text = f"-{self.format_currency_brl(transaction['value'])}"
-
-            # CONVERTER DATA E HORA para formato BR na exibição
-            datetime_display = self.convert_datetime_db_to_br(transaction['date'])
-
-            # Dados - manter alinhamento com cabeçalho
-            labels_data = [
-                str(transaction['id']),
-                datetime_display,
-                transaction['type'],
-                transaction['category'],
-                value_text,
-                transaction['description'] or '-'
-            ]
-
-            # Adicionar labels
-            for i, text in enumerate(labels_data):
-                label = ctk.CTkLabel(
-                    row_frame,
-                    text=text,
-                    text_color=color if i == 4 else None,
-                    width=120 if i == 1 else (100 if i != 5 else 150),
-                    anchor='w'
-                )
-                label.grid(row=0, column=i, padx=2, pady=1, sticky='w')
-
-            # BOTÕES DE AÇÃO - EDITAR (TEXTO) E EXCLUIR (ÍCONE)
-            button_frame = ctk.CTkFrame(row_frame, fg_color="transparent")
-            button_frame.grid(row=0, column=6, padx=2, pady=1)
-
-            # Botão Editar - COM TEXTO
-            edit_btn = ctk.CTkButton(
-                button_frame,
-                text="Editar",
-                width=60,
-                height=25,
-                font=('Arial', 10),
-                fg_color="#2b5b84",
-                hover_color="#1e4161",
-                command=lambda id=transaction['id']: self.edit_transaction(id)
-            )
-            edit_btn.pack(side='left', padx=(0, 5))
-
-            # Botão Excluir - COM ÍCONE X
-            delete_btn = ctk.CTkButton(
-                button_frame,
-                text="❌",
-                width=30,
-                height=25,
-                font=('Arial', 12),
-                fg_color="#8b0000",
-                hover_color="#600000",
-                command=lambda id=transaction['id']: self.delete_transaction(id)
-            )
-            delete_btn.pack(side='left')
-
-            # REMOVIDO: Tooltips dos botões (não são necessárias)
-
-            # Configurar pesos das colunas
-            for i in range(7):  # 7 colunas
-                row_frame.grid_columnconfigure(i, weight=1)
-
-        except Exception as e:
-            print(f"Erro ao criar linha da transação: {e}")
+    def format_transaction_row(self, transaction):
+        """Textos das colunas e cor do valor de uma linha da lista"""
+        # Lógica de cores e sinais
+        if transaction['type'] == 'Receita':
+            color = "green"
+            value_text = f"+{self.format_currency_brl(transaction['value'])}"
+        else:  # Despesa
+            color = "red"
+            value_text = f"-{self.format_currency_brl(transaction['value'])}"
+
+        # CONVERTER DATA E HORA para formato BR na exibição
+        datetime_display = self.convert_datetime_db_to_br(transaction['date'])
+
+        # Dados - manter alinhamento com cabeçalho
+        texts = [
+            str(transaction['id']),
+            datetime_display,
+            transaction['type'],
+            transaction['category'],
+            value_text,
+            transaction['description'] or '-'
+        ]
+        return texts, color
 
     def delete_transaction(self, transaction_id):
         """Exclui uma transação"""
         if messagebox.askyesno("Confirmar", "Deseja excluir esta transação?"):
-            success = self.db_service.delete_transaction(transaction_id)
-            if success:
-                self.update_display()
-                messagebox.showinfo("Sucesso", "Transação excluída com sucesso!")
-            else:
-                messagebox.showerror("Erro", "Erro ao excluir transação.")
+            self.db.delete_transaction(transaction_id, on_done=self.on_transaction_deleted)
+
+    def on_transaction_deleted(self, deleted):
+        """Resposta da exclusão: a transação removida ou None"""
+        if deleted:
+            self.apply_change('delete', deleted, None)
+            messagebox.showinfo("Sucesso", "Transação excluída com sucesso!")
+        else:
+            messagebox.showerror("Erro", "Erro ao excluir transação.")
 
     def export_data(self):
         """Exporta dados para diferentes formatos"""
         try:
             from ui.export_window import ExportWindow
-            ExportWindow(self, self.db_service)
+            ExportWindow(self, self.db)
         except Exception as e:
             messagebox.showerror("Erro", f"Não foi possível abrir a janela de exportação: {e}")
 
+    def on_close(self):
+        """Fecha a conexão do banco e encerra o aplicativo"""
+        # Espera a consulta em andamento; as que estavam na fila são descartadas
+        self.db.shutdown()
+        self.db_service.close()
+        self.destroy()
+
 
 if __name__ == "__main__":
     app = MainWindow()
@@ -0,0 +1,396 @@
+# ui/virtual_list.py
+import bisect
+import math
+import sys
+
+import customtkinter as ctk
+
+from services.repository import SORTABLE_COLUMNS
+
+# Colunas da tabela: (título, coluna de ordenação, largura)
+COLUMNS = [
+    ('ID', 'id', 100),
+    ('Data/Hora', 'date', 120),
+    ('Tipo', 'type', 100),
+    ('Categoria', 'category', 100),
+    ('Valor', 'value', 100),
+    ('Descrição', 'description', 150),
+]
+
+
+class TransactionPager:
+    """Linhas já carregadas da lista, buscadas do banco em páginas sob demanda
+
+    `fetch_page(cursor, limit, on_page)` pede uma página sem bloquear e
+    chama on_page(página) quando ela chega; a página segue o contrato de
+    DatabaseService.query_transactions: 'transactions', 'next_cursor' e,
+    na primeira, 'total' e 'total_exact'. on_loaded() avisa que chegaram
+    linhas. insert/remove ajustam as linhas carregadas depois de uma
+    escrita; elas assumem que a linha passa pelos filtros da página.
+    """
+
+    def __init__(self, fetch_page, on_loaded=None, page_size=200):
+        self.fetch_page = fetch_page
+        self.on_loaded = on_loaded
+        self.page_size = page_size
+        self.sort_column = 'id'
+        self.ascending = True
+        self.generation = 0
+        self.reset()
+
+    def reset(self):
+        """Descarta as linhas carregadas; a próxima leitura recomeça do início"""
+        # Páginas pedidas antes do reset chegam com a geração antiga e são ignoradas
+        self.generation += 1
+        self.rows = []
+        self.cursor = None
+        self.total = 0
+        self.total_exact = True
+        self.started = False
+        self.loading = False
+        self.wanted = 0
+
+    @property
+    def exhausted(self):
+        return self.started and self.cursor is None
+
+    def load_until(self, count):
+        """Pede as páginas que faltam para ter `count` linhas (ou o fim da lista)"""
+        self.wanted = max(self.wanted, count)
+        if len(self.rows) >= self.wanted or self.exhausted or self.loading:
+            return
+        self.loading = True
+        generation = self.generation
+        # Um salto da barra de rolagem pede tudo até lá de uma vez
+        limit = max(self.page_size, self.wanted - len(self.rows))
+        self.fetch_page(self.cursor, limit, lambda page: self.add_page(generation, page))
+
+    def add_page(self, generation, page):
+        """Recebe uma página pedida por load_until"""
+        if generation != self.generation:
+            return
+        self.loading = False
+        if not self.started:
+            self.started = True
+            self.total = page['total']
+            self.total_exact = page['total_exact']
+        self.rows.extend(page['transactions'])
+        self.cursor = page['next_cursor']
+
+        if self.exhausted:
+            self.total = len(self.rows)
+            self.total_exact = True
+        else:
+            # Estimativa limitada: cresce conforme as páginas chegam
+            self.total = max(self.total, len(self.rows) + 1)
+
+        self.load_until(self.wanted)
+        if self.on_loaded:
+            self.on_loaded()
+
+    def window(self, start, count):
+        """Linhas de `start` até `start + count` já carregadas; pede o que faltar"""
+        self.load_until(start + count)
+        return self.rows[start:start + count]
+
+    # ---------- Alterações locais ----------
+
+    def sort_key(self, transaction):
+        return self._key(transaction[SORTABLE_COLUMNS.get(self.sort_column, 'id')], transaction['id'])
+
+    def _key(self, value, transaction_id):
+        # Mesma ordem do ORDER BY coluna, id do banco: NULL antes de qualquer valor
+        key = (value is not None, value, transaction_id)
+        return key if self.ascending else _Reversed(key)
+
+    def position(self, transaction):
+        """Índice onde `transaction` entra nas linhas carregadas"""
+        return bisect.bisect_left(self.rows, self.sort_key(transaction), key=self.sort_key)
+
+    def insert(self, transaction):
+        """Inclui uma linha nova sem recarregar
+
+        Se ela cai depois do cursor, a próxima página já vai trazê-la;
+        só o total muda.
+        """
+        if not self.started:
+            return
+        # A própria linha do cursor (editada sem mudar de posição) também fica
+        if self.exhausted or not self._key(*self.cursor) < self.sort_key(transaction):
+            self.rows.insert(self.position(transaction), transaction)
+        self.total += 1
+
+    def remove(self, transaction_id):
+        """Tira uma linha sem recarregar; o cursor continua valendo como posição"""
+        if not self.started:
+            return
+        for index, row in enumerate(self.rows):
+            if row['id'] == transaction_id:
+                del self.rows[index]
+                self.total -= 1
+                return
+        if not self.exhausted:
+            # Ainda não carregada: só sai da contagem
+            self.total = max(len(self.rows), self.total - 1)
+
+
+class _Reversed:
+    """Inverte a comparação de uma chave, para buscar na ordem decrescente"""
+
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+class TransactionRow(ctk.CTkFrame):
+    """Linha reaproveitável: os widgets são criados uma vez e religados a cada rolagem"""
+
+    def __init__(self, master, on_edit, on_delete, **kwargs):
+        super().__init__(master, **kwargs)
+        self.transaction = None
+        self.shown = False
+
+        self.labels = []
+        for i, (_, _, width) in enumerate(COLUMNS):
+            label = ctk.CTkLabel(self, text='', width=width, anchor='w')
+            label.grid(row=0, column=i, padx=2, pady=1, sticky='w')
+            self.labels.append(label)
+
+        # Botões de ação - Editar (texto) e Excluir (ícone)
+        button_frame = ctk.CTkFrame(self, fg_color="transparent")
+        button_frame.grid(row=0, column=len(COLUMNS), padx=2, pady=1)
+
+        ctk.CTkButton(
+            button_frame,
+            text="Editar",
+            width=60,
+            height=25,
+            font=('Arial', 10),
+            fg_color="#2b5b84",
+            hover_color="#1e4161",
+            command=lambda: on_edit(self.transaction['id'])
+        ).pack(side='left', padx=(0, 5))
+
+        ctk.CTkButton(
+            button_frame,
+            text="❌",
+            width=30,
+            height=25,
+            font=('Arial', 12),
+            fg_color="#8b0000",
+            hover_color="#600000",
+            command=lambda: on_delete(self.transaction['id'])
+        ).pack(side='left')
+
+        for i in range(len(COLUMNS) + 1):
+            self.grid_columnconfigure(i, weight=1)
+
+    def bind_transaction(self, transaction, texts, value_color):
+        """Mostra `transaction` nesta linha, só trocando textos e cores"""
+        self.transaction = transaction
+        for i, (label, text) in enumerate(zip(self.labels, texts)):
+            label.configure(text=text, text_color=value_color if i == 4 else None)
+
+
+class VirtualTransactionList(ctk.CTkFrame):
+    """Lista virtualizada de transações
+
+    Mantém só as linhas que cabem na área visível; ao rolar, as mesmas
+    linhas são religadas aos dados e as páginas seguintes são pedidas ao
+    banco conforme necessário, sem bloquear: a lista é redesenhada quando
+    elas chegam. O custo de atualizar depende do tamanho da janela, não
+    do histórico.
+    """
+
+    WHEEL_STEP = 3
+
+    def __init__(self, master, fetch_page, format_row, on_sort, on_edit, on_delete, **kwargs):
+        super().__init__(master, **kwargs)
+        self.pager = TransactionPager(fetch_page, on_loaded=self.render)
+        self.format_row = format_row
+        self.on_edit = on_edit
+        self.on_delete = on_delete
+
+        self.top = 0
+        self.visible_rows = 1
+        self.row_height = None
+        self.pool = []
+
+        self.create_header(on_sort)
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side='left', fill='both', expand=True)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+
+        # "Carregando..." enquanto uma página está a caminho, ou lista vazia
+        self.status_label = ctk.CTkLabel(self.body, text='', font=('Arial', 14))
+
+        self.body.bind("<Configure>", self.on_resize)
+        if "linux" in sys.platform:
+            self.bind_all("<Button-4>", self.on_mouse_wheel, add=True)
+            self.bind_all("<Button-5>", self.on_mouse_wheel, add=True)
+        else:
+            self.bind_all("<MouseWheel>", self.on_mouse_wheel, add=True)
+
+    def create_header(self, on_sort):
+        """Cria o cabeçalho clicável, fora da área que rola"""
+        header_frame = ctk.CTkFrame(self)
+        header_frame.pack(side='top', fill='x', pady=5)
+
+        self.header_buttons = {}
+        for i, (display_name, column_name, width) in enumerate(COLUMNS):
+            btn = ctk.CTkButton(
+                header_frame,
+                text=display_name,
+                font=('Arial', 12, 'bold'),
+                width=width,
+                height=30,
+                command=lambda col=column_name: on_sort(col)
+            )
+            btn.grid(row=0, column=i, padx=2, pady=2, sticky='ew')
+            self.header_buttons[column_name] = (btn, display_name)
+
+        # Coluna Ações não é clicável
+        ctk.CTkLabel(header_frame, text='Ações', font=('Arial', 12, 'bold'),
+                     width=80).grid(row=0, column=len(COLUMNS), padx=2, pady=2)
+
+        for i in range(len(COLUMNS) + 1):
+            header_frame.grid_columnconfigure(i, weight=1)
+
+    def set_sort(self, column, ascending):
+        """Guarda a ordenação (para encaixar linhas alteradas) e a marca no cabeçalho"""
+        self.pager.sort_column = column
+        self.pager.ascending = ascending
+        for column_name, (btn, display_name) in self.header_buttons.items():
+            if column_name == column:
+                display_name = f"{display_name} {'↑' if ascending else '↓'}"
+            btn.configure(text=display_name)
+
+    # ---------- Dados ----------
+
+    def refresh(self, keep_position=True):
+        """Recarrega a partir do banco, buscando só as páginas até a área visível
+
+        As linhas atuais continuam na tela até a resposta chegar.
+        """
+        if not keep_position:
+            self.top = 0
+        self.pager.reset()
+        self.render()
+
+    def apply_change(self, op, old, new):
+        """Encaixa uma linha inserida, editada ou excluída sem recarregar a lista
+
+        Só as linhas visíveis cujo dado mudou são religadas: editar uma
+        linha que não mudou de posição mexe em um único widget.
+        """
+        if op in ('update', 'delete') and old is not None:
+            self.pager.remove(old['id'])
+        if op in ('insert', 'update') and new is not None:
+            self.pager.insert(new)
+        self.render()
+
+    def scroll_to(self, index):
+        """Posiciona a primeira linha visível em `index`"""
+        self.pager.load_until(index + self.visible_rows)
+        self.top = max(0, min(index, self.pager.total - self.visible_rows))
+        self.render()
+
+    def render(self):
+        """Religa as linhas do pool ao trecho visível dos dados"""
+        self.ensure_pool()
+        window = self.pager.window(self.top, self.visible_rows)
+        if not window and self.top > 0 and self.pager.exhausted:
+            # A lista encolheu (exclusão/filtro): volta para o fim dela
+            self.top = max(0, self.pager.total - self.visible_rows)
+            window = self.pager.window(self.top, self.visible_rows)
+        # Faltam linhas que ainda estão a caminho: o resto do pool fica como está
+        loading = self.pager.loading and len(window) < self.visible_rows
+
+        # As linhas exibidas são sempre um prefixo do pool, então
+        # mostrar/esconder em ordem mantém a ordem do pack
+        for i, row in enumerate(self.pool):
+            if i < len(window):
+                if row.transaction is not window[i]:
+                    texts, value_color = self.format_row(window[i])
+                    row.bind_transaction(window[i], texts, value_color)
+                if not row.shown:
+                    row.pack(fill='x', pady=1)
+                    row.shown = True
+            elif row.shown and not loading:
+                row.pack_forget()
+                row.shown = False
+
+        if loading:
+            self.status_label.configure(text="⏳ Carregando...")
+            self.status_label.place(relx=0.5, rely=0.95, anchor='s')
+        elif self.pager.total == 0:
+            self.status_label.configure(text="Nenhuma transação encontrada.")
+            self.status_label.place(relx=0.5, rely=0.3, anchor='center')
+        else:
+            self.status_label.place_forget()
+
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = max(self.pager.total, 1)
+        first = self.top / total
+        last = min(1.0, (self.top + self.visible_rows) / total)
+        self.scrollbar.set(first, last)
+
+    # ---------- Pool de linhas ----------
+
+    def ensure_pool(self):
+        """Cria linhas até cobrir a altura visível; nunca passa disso"""
+        if self.row_height is None:
+            row = self.create_row()
+            row.update_idletasks()
+            self.pool.append(row)
+            self.row_height = max(row.winfo_reqheight(), 28) + 2  # pady=1
+
+        height = self.body.winfo_height()
+        if height > 1:
+            self.visible_rows = max(1, math.ceil(height / self.row_height))
+
+        while len(self.pool) < self.visible_rows:
+            self.pool.append(self.create_row())
+
+    def create_row(self):
+        return TransactionRow(self.body, self.on_edit, self.on_delete)
+
+    # ---------- Rolagem ----------
+
+    def on_resize(self, event):
+        if self.row_height is not None:
+            visible_rows = max(1, math.ceil(event.height / self.row_height))
+            if visible_rows == self.visible_rows:
+                return
+        self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            index = round(float(amount) * self.pager.total)
+        else:
+            step = self.visible_rows if unit == 'pages' else 1
+            index = self.top + int(amount) * step
+        self.scroll_to(index)
+
+    def on_mouse_wheel(self, event):
+        # bind_all recebe a roda de qualquer lugar da janela: só rola
+        # quando o ponteiro está sobre esta lista
+        widget = str(event.widget)
+        if widget != str(self) and not widget.startswith(str(self) + '.'):
+            return
+        if "linux" in sys.platform:
+            direction = -1 if event.num == 4 else 1
+        elif event.delta:
+            direction = -1 if event.delta > 0 else 1
+        else:
+            return
+        self.scroll_to(self.top + direction * self.WHEEL_STEP)
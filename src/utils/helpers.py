@@ -26,6 +26,18 @@ def get_month_range(month_offset=0):
     return first_day.strftime('%Y-%m-%d'), last_day.strftime('%Y-%m-%d')
 
 
+def get_period_range(period, now=None):
+    """Retorna (início, fim) do período ('all', '30days', 'this_month'); None quando aberto"""
+    now = now or datetime.now()
+    if period == '30days':
+        return now - timedelta(days=30), None
+    if period == 'this_month':
+        first_day = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        next_month = (first_day + timedelta(days=32)).replace(day=1)
+        return first_day, next_month
+    return None, None
+
+
 def ensure_directory(path: str):
     """Garante que um diretório existe"""
     os.makedirs(path, exist_ok=True)
\ No newline at end of file
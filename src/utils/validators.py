@@ -1,5 +1,7 @@
 # utils/validators.py
 from datetime import datetime
+from decimal import Decimal
+from services.repository import to_cents, check_value_cents
 
 def validate_date_br(date_string):
     """Valida formato de data dd/mm/aaaa"""
@@ -55,13 +57,15 @@ def convert_date_db_to_br(date_db):
         return date_db
 
 def validate_amount(amount_str):
-    """Valida valor monetário e retorna (é_válido, valor)"""
+    """Valida valor monetário e retorna (é_válido, valor) com o valor em Decimal, sem perdas de float.
+
+    Usa a mesma regra da API: centavos positivos e até repository.MAX_VALUE_CENTS.
+    """
     try:
-        value_str = amount_str.replace(',', '.')
-        value = float(value_str)
-        return (value > 0, value)
+        cents = check_value_cents(to_cents(amount_str.strip().replace(',', '.')))
+        return (True, Decimal(cents).scaleb(-2))
     except ValueError:
-        return (False, 0.0)
+        return (False, Decimal(0))
 
 def validate_category(category: str, available_categories: list) -> bool:
     """Valida se categoria existe na lista"""